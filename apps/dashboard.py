@@ -3,73 +3,195 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from dash import Dash, html, dcc, Input, Output
+from dash import Dash, html, dcc, Input, Output, State, no_update
+from flask import Response
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from utils.data_handler import DataHandler
+from utils.downsample import lttb
 from strategies.momentum import MomentumStrategy
 from strategies.mean_reversion import MeanReversionStrategy
 from strategies.arbitrage import ArbitrageStrategy
+from strategies.indicators import StrategySet
 import pandas as pd
+import threading
+from typing import Optional
 from utils.logger import setup_logger
+from utils.metrics import REGISTRY
 
-app = Dash(__name__)
 logger = setup_logger(__name__)
 
-data_handler = DataHandler()
-ticker1 = "AAPL"
-ticker2 = "SPY"
-momentum = MomentumStrategy(window=10)
-mean_reversion = MeanReversionStrategy(window=20)
-arbitrage = ArbitrageStrategy(ticker1, ticker2, threshold=0.005)
-
-app.layout = html.Div([
-    html.H1("Algorithmic Trading Dashboard"),
-    dcc.Interval(id='interval-component', interval=60*1000, n_intervals=0),
-    html.Div([
-        html.H3(f"{ticker1} Signals"),
-        dcc.Graph(id='ticker1-plot'),
-    ]),
-    html.Div([
-        html.H3(f"{ticker2} vs {ticker1} Arbitrage"),
-        dcc.Graph(id='arbitrage-plot'),
-    ]),
-])
-
-@app.callback(
-    [Output('ticker1-plot', 'figure'),
-     Output('arbitrage-plot', 'figure')],
-    [Input('interval-component', 'n_intervals')]
-)
-def update_plots(n):
-    df1 = data_handler.query_influxdb(ticker1, start_time="-5d")  # Changed to -5d
-    df2 = data_handler.query_influxdb(ticker2, start_time="-5d")  # Changed to -5d
-    
-    if df1 is None or df2 is None:
-        logger.error("Failed to retrieve data for plotting.")
-        return go.Figure(), go.Figure()
-
-    df_momentum = momentum.generate_signals(df1.copy())
-    df_mean_reversion = mean_reversion.generate_signals(df1.copy())
-    df_arbitrage = arbitrage.generate_signals(df1, df2)
-
-    fig1 = make_subplots(rows=2, cols=1, shared_xaxes=True, 
-                         subplot_titles=("Price with Momentum Signals", "Price with Mean-Reversion Signals"))
-    fig1.add_trace(go.Scatter(x=df_momentum['time'], y=df_momentum['close'], mode='lines', name='Close'), row=1, col=1)
-    fig1.add_trace(go.Scatter(x=df_momentum['time'], y=df_momentum['signal'] * df_momentum['close'].max(), 
-                             mode='markers', name='Momentum Signal', marker=dict(color='red')), row=1, col=1)
-    fig1.add_trace(go.Scatter(x=df_mean_reversion['time'], y=df_mean_reversion['close'], mode='lines', name='Close'), row=2, col=1)
-    fig1.add_trace(go.Scatter(x=df_mean_reversion['time'], y=df_mean_reversion['signal'] * df_mean_reversion['close'].max(), 
-                             mode='markers', name='Mean-Reversion Signal', marker=dict(color='green')), row=2, col=1)
-    fig1.update_layout(height=600, title_text=f"{ticker1} Multi-Strategy Comparison")
-
-    fig2 = go.Figure()
-    fig2.add_trace(go.Scatter(x=df_arbitrage['time'], y=df_arbitrage['spread'], mode='lines', name='Spread'))
-    fig2.add_trace(go.Scatter(x=df_arbitrage['time'], y=df_arbitrage['signal'] * df_arbitrage['spread'].max(), 
-                             mode='markers', name='Arbitrage Signal', marker=dict(color='purple')))
-    fig2.update_layout(title=f"Arbitrage Spread: {ticker1} vs {ticker2}", yaxis_title="Spread")
-
-    return fig1, fig2
+# Points per trace sent to the browser; the server downsamples to this at the visible range
+MAX_POINTS = 2000
+
+
+class SignalCache:
+    # Strategy outputs for the dashboard, recomputed only when a new bar has arrived since the
+    # previous interval tick instead of on every callback.
+    def __init__(self, data_handler, ticker1: str, ticker2: str, start_time: str):
+        self.data_handler = data_handler
+        self.ticker1 = ticker1
+        self.ticker2 = ticker2
+        self.start_time = start_time
+        self.strategies = StrategySet({
+            "momentum": MomentumStrategy(window=10),
+            "mean_reversion": MeanReversionStrategy(window=20),
+        })
+        self.arbitrage = ArbitrageStrategy(ticker1, ticker2, threshold=0.005)
+        self.frames = None
+        self._last = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        df1 = self.data_handler.query_cached(self.ticker1, start_time=self.start_time)
+        df2 = self.data_handler.query_cached(self.ticker2, start_time=self.start_time)
+        if df1 is None or df2 is None:
+            return self.frames
+        last = (df1['time'].iloc[-1], df2['time'].iloc[-1])
+        with self._lock:
+            if last != self._last:
+                self.frames = (self.strategies.frame(df1), self.arbitrage.generate_signals(df1, df2))
+                self._last = last
+            return self.frames
+
+
+def _utc(value) -> pd.Timestamp:
+    # Plotly reports axis ranges as naive strings in the data's timezone, which is UTC here
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts
+
+
+def visible_range(relayout):
+    # x-range the user zoomed to, or None for the full history
+    if not relayout:
+        return None
+    for axis in ('xaxis', 'xaxis2'):
+        if f'{axis}.range[0]' in relayout:
+            return _utc(relayout[f'{axis}.range[0]']), _utc(relayout[f'{axis}.range[1]'])
+        if f'{axis}.range' in relayout:
+            start, end = relayout[f'{axis}.range']
+            return _utc(start), _utc(end)
+    return None
+
+
+def downsample(df: pd.DataFrame, column: str, x_range, max_points: int) -> pd.DataFrame:
+    if x_range is not None:
+        start, end = x_range
+        df = df.iloc[df['time'].searchsorted(start):df['time'].searchsorted(end, side='right')]
+    if len(df) <= max_points:
+        return df
+    x = df['time'].astype('int64').to_numpy()
+    return df.iloc[lttb(x, df[column].to_numpy(), max_points)]
+
+
+def last_time(df: pd.DataFrame, previous: Optional[str] = None) -> Optional[str]:
+    # Cursor for extend_plots; an empty frame (e.g. two tickers whose bars don't line up yet)
+    # keeps the previous cursor
+    return df['time'].iloc[-1].isoformat() if len(df) else previous
+
+
+def newer_than(df: pd.DataFrame, cursor: Optional[str]) -> pd.Series:
+    # Rows after the cursor; with no cursor yet every row is new
+    if cursor is None:
+        return pd.Series(True, index=df.index)
+    return df['time'] > pd.Timestamp(cursor)
+
+
+def create_app(data_handler, ticker1: str = "AAPL", ticker2: str = "SPY", start_time: str = "-5d",
+               max_points: int = MAX_POINTS) -> Dash:
+    app = Dash(__name__)
+    signals = SignalCache(data_handler, ticker1, ticker2, start_time)
+
+    @app.server.route('/metrics')
+    def metrics():
+        # Prometheus scrape target, served by the Dash app's Flask server
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    app.layout = html.Div([
+        html.H1("Algorithmic Trading Dashboard"),
+        dcc.Interval(id='interval-component', interval=60*1000, n_intervals=0),
+        # time of the newest point each figure already holds in the browser
+        dcc.Store(id='last-sent', data={}),
+        html.Div([
+            html.H3(f"{ticker1} Signals"),
+            dcc.Graph(id='ticker1-plot'),
+        ]),
+        html.Div([
+            html.H3(f"{ticker2} vs {ticker1} Arbitrage"),
+            dcc.Graph(id='arbitrage-plot'),
+        ]),
+    ])
+
+    @app.callback(
+        [Output('ticker1-plot', 'figure'),
+         Output('arbitrage-plot', 'figure'),
+         Output('last-sent', 'data')],
+        [Input('ticker1-plot', 'relayoutData'),
+         Input('arbitrage-plot', 'relayoutData')]
+    )
+    def update_plots(relayout1, relayout2):
+        # Full figures, downsampled to the zoomed range; sent on load and on zoom/pan only.
+        frames = signals.get()
+        if frames is None:
+            logger.error("Failed to retrieve data for plotting.")
+            return go.Figure(), go.Figure(), {}
+        df_signals, df_arbitrage = frames
+
+        view = downsample(df_signals, 'close', visible_range(relayout1), max_points)
+        close_max = df_signals['close'].max()
+        fig1 = make_subplots(rows=2, cols=1, shared_xaxes=True,
+                             subplot_titles=("Price with Momentum Signals", "Price with Mean-Reversion Signals"))
+        fig1.add_trace(go.Scatter(x=view['time'], y=view['close'], mode='lines', name='Close'), row=1, col=1)
+        fig1.add_trace(go.Scatter(x=view['time'], y=view['momentum'] * close_max,
+                                 mode='markers', name='Momentum Signal', marker=dict(color='red')), row=1, col=1)
+        fig1.add_trace(go.Scatter(x=view['time'], y=view['close'], mode='lines', name='Close'), row=2, col=1)
+        fig1.add_trace(go.Scatter(x=view['time'], y=view['mean_reversion'] * close_max,
+                                 mode='markers', name='Mean-Reversion Signal', marker=dict(color='green')), row=2, col=1)
+        fig1.update_layout(height=600, title_text=f"{ticker1} Multi-Strategy Comparison", uirevision=ticker1)
+
+        arbitrage_view = downsample(df_arbitrage, 'spread', visible_range(relayout2), max_points)
+        fig2 = go.Figure()
+        fig2.add_trace(go.Scatter(x=arbitrage_view['time'], y=arbitrage_view['spread'], mode='lines', name='Spread'))
+        fig2.add_trace(go.Scatter(x=arbitrage_view['time'], y=arbitrage_view['signal'] * df_arbitrage['spread'].max(),
+                                 mode='markers', name='Arbitrage Signal', marker=dict(color='purple')))
+        fig2.update_layout(title=f"Arbitrage Spread: {ticker1} vs {ticker2}", yaxis_title="Spread",
+                           uirevision=f"{ticker1}-{ticker2}")
+
+        return fig1, fig2, {'ticker1': last_time(df_signals), 'arbitrage': last_time(df_arbitrage)}
+
+    @app.callback(
+        [Output('ticker1-plot', 'extendData'),
+         Output('arbitrage-plot', 'extendData'),
+         Output('last-sent', 'data', allow_duplicate=True)],
+        [Input('interval-component', 'n_intervals')],
+        [State('last-sent', 'data')],
+        prevent_initial_call=True
+    )
+    def extend_plots(n, sent):
+        # Every interval tick only appends the bars that arrived since the last update.
+        frames = signals.get()
+        if frames is None or not sent:
+            return no_update, no_update, no_update
+        df_signals, df_arbitrage = frames
+
+        new1 = newer_than(df_signals, sent.get('ticker1'))
+        new2 = newer_than(df_arbitrage, sent.get('arbitrage'))
+        extend1 = extend2 = no_update
+        if new1.any():
+            s, close_max = df_signals[new1], df_signals['close'].max()
+            extend1 = (dict(x=[s['time']] * 4,
+                            y=[s['close'], s['momentum'] * close_max, s['close'], s['mean_reversion'] * close_max]),
+                       [0, 1, 2, 3], 2 * max_points)
+        if new2.any():
+            a = df_arbitrage[new2]
+            extend2 = (dict(x=[a['time'], a['time']], y=[a['spread'], a['signal'] * df_arbitrage['spread'].max()]),
+                       [0, 1], 2 * max_points)
+        return extend1, extend2, {'ticker1': last_time(df_signals, sent.get('ticker1')),
+                                  'arbitrage': last_time(df_arbitrage, sent.get('arbitrage'))}
+
+    return app
+
 
 if __name__ == "__main__":
-    app.run_server(debug=True, host='0.0.0.0', port=8051)
\ No newline at end of file
+    from utils.data_handler import DataHandler
+    app = create_app(DataHandler())
+    app.run_server(debug=True, host='0.0.0.0', port=8051)
@@ -1,6 +1,9 @@
 
+from typing import Dict, List, Optional, Union
+import math
 import backtrader as bt
 from utils.logger import setup_logger
+from utils.metrics import BACKTEST_SECONDS, timed
 
 class BacktestEngine:
     def __init__(self, cash: float = 10000.0, commission: float = 0.001):
@@ -8,26 +11,96 @@ class BacktestEngine:
         self.commission = commission
         self.logger = setup_logger(__name__)
 
-    def run_backtest(self, data: bt.feeds.PandasData, strategy: bt.Strategy) -> bt.Cerebro:
-        cerebro = bt.Cerebro()
-        cerebro.addstrategy(strategy)
-        cerebro.adddata(data)
+    def run_backtest(self, data: Union[bt.feed.DataBase, List[bt.feed.DataBase], Dict[str, bt.feed.DataBase]],
+                     strategy: Union[type, list], analyzers: Optional[Dict[str, tuple]] = None,
+                     preload: bool = True, runonce: bool = True, stdstats: bool = True,
+                     **strategy_params) -> bt.Cerebro:
+        # data is one feed, a list of feeds or a dict of name -> feed (strategies can then use
+        # getdatabyname). strategy is one class or a list of classes and (class, params) tuples;
+        # strategy_params are defaults for every strategy that declares them (a mixed list can
+        # share e.g. threshold; one that no strategy declares is a TypeError), while tuple params go
+        # to their class as given. All feeds and strategies share one broker, so a portfolio runs
+        # in a single Cerebro. preload/runonce keep backtrader in its vectorized mode;
+        # stdstats=False skips the default observers, e.g. for many feeds.
+        # analyzers maps a name to (analyzer class, kwargs) and is added to every strategy;
+        # results are on cerebro.runstrats[0][i].analyzers, in the order the strategies were given.
+        cerebro = bt.Cerebro(preload=preload, runonce=runonce, stdstats=stdstats)
+        entries = [entry if isinstance(entry, tuple) else (entry, {})
+                   for entry in (strategy if isinstance(strategy, (list, tuple)) else [strategy])]
+        unknown = set(strategy_params).difference(*(cls.params._getkeys() for cls, _ in entries))
+        if unknown:
+            raise TypeError(f"No strategy takes the parameters {sorted(unknown)}")
+        for cls, params in entries:
+            shared = {k: v for k, v in strategy_params.items() if k in cls.params._getkeys()}
+            cerebro.addstrategy(cls, **{**shared, **params})
+        feeds = data.items() if isinstance(data, dict) else ((None, feed) for feed in
+                                                              (data if isinstance(data, (list, tuple)) else [data]))
+        for name, feed in feeds:
+            cerebro.adddata(feed, name=name)
+        for name, (analyzer, kwargs) in (analyzers or {}).items():
+            cerebro.addanalyzer(analyzer, _name=name, **kwargs)
         cerebro.broker.setcash(self.cash)
         cerebro.broker.setcommission(commission=self.commission)
-        
-        self.logger.info("Starting backtest...")
-        cerebro.run()
+
+        self.logger.info(f"Starting backtest: {len(cerebro.datas)} feeds, {len(cerebro.strats)} strategies")
+        with timed(BACKTEST_SECONDS, engine="backtrader"):
+            cerebro.run()
         self.logger.info(f"Final portfolio value: {cerebro.broker.getvalue():.2f}")
         return cerebro
 
 class MomentumBTStrategy(bt.Strategy):
+    # Buys on positive and sells on negative percent change over window bars, on every feed
     params = (("window", 10),)
     def __init__(self):
-        self.momentum = bt.indicators.PercentChange(period=self.params.window)
+        self.momentum = [bt.indicators.PercentChange(d, period=self.params.window) for d in self.datas]
+        self.logger = setup_logger(__name__)
+
+    def next(self):
+        for d, momentum in zip(self.datas, self.momentum):
+            if momentum[0] > 0:
+                self.buy(data=d)
+            elif momentum[0] < 0:
+                self.sell(data=d)
+
+class MeanReversionBTStrategy(bt.Strategy):
+    # MeanReversionStrategy's Bollinger Band rule on every feed: hold size long below the lower
+    # band, size short above the upper band and flat in between
+    params = (("window", 20), ("std_dev", 2.0), ("size", 1))
+    def __init__(self):
+        # bt's StdDev is the population deviation; rescale to the sample one pandas uses
+        n = self.params.window
+        scale = self.params.std_dev * math.sqrt(n / (n - 1))
+        self.bands = []
+        for d in self.datas:
+            sma = bt.indicators.SMA(d.close, period=n)
+            width = bt.indicators.StdDev(d.close, period=n) * scale
+            self.bands.append((sma - width, sma + width))
+        self.logger = setup_logger(__name__)
+
+    def next(self):
+        for d, (lower, upper) in zip(self.datas, self.bands):
+            signal = 1 if d.close[0] < lower[0] else -1 if d.close[0] > upper[0] else 0
+            if self.getposition(d).size != signal * self.params.size:
+                self.order_target_size(data=d, target=signal * self.params.size)
+
+class ArbitrageBTStrategy(bt.Strategy):
+    # ArbitrageStrategy's spread rule for pairs of feeds, given as (index or name, index or name).
+    # Signal 1 holds size of the first leg long and the second short, -1 the reverse, 0 flat;
+    # a feed in several pairs holds the sum of its targets.
+    params = (("threshold", 0.02), ("size", 1), ("pairs", None))
+    def __init__(self):
+        feed = lambda key: self.getdatabyname(key) if isinstance(key, str) else self.datas[key]
+        self.pairs = [(feed(a), feed(b)) for a, b in (self.params.pairs or [(0, 1)])]
+        self.spreads = [(d1.close - d2.close) / d2.close for d1, d2 in self.pairs]
         self.logger = setup_logger(__name__)
 
     def next(self):
-        if self.momentum[0] > 0:
-            self.buy()
-        elif self.momentum[0] < 0:
-            self.sell()
\ No newline at end of file
+        threshold = self.params.threshold
+        targets = {}
+        for (d1, d2), spread in zip(self.pairs, self.spreads):
+            signal = 1 if spread[0] > threshold else -1 if spread[0] < -threshold else 0
+            targets[d1] = targets.get(d1, 0) + signal * self.params.size
+            targets[d2] = targets.get(d2, 0) - signal * self.params.size
+        for d, target in targets.items():
+            if self.getposition(d).size != target:
+                self.order_target_size(data=d, target=target)
@@ -0,0 +1,80 @@
+
+from array import array
+from typing import Dict
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+NS_PER_DAY = 86400 * 10**9
+# Proleptic Gregorian ordinal of 1970-01-01, the origin of backtrader's float datetimes
+EPOCH_ORDINAL = 719163
+
+
+def to_bt_datetime(times) -> np.ndarray:
+    # UTC timestamps -> backtrader's float days, bit-identical to bt.date2num on each datetime
+    ns = pd.DatetimeIndex(pd.to_datetime(times, utc=True)).as_unit("ns").asi8
+    days, rest = np.divmod(ns, NS_PER_DAY)
+    return (EPOCH_ORDINAL + days).astype("float64") + rest / NS_PER_DAY
+
+
+class NumpyData(bt.feed.DataBase):
+    # Data feed over in-memory arrays. dataname is a dict with a "time" array (datetime64 or
+    # tz-aware timestamps, UTC) and open/high/low/close/volume arrays of the same length.
+    # With cerebro's preload (the default) every line is filled with one bulk copy instead of
+    # backtrader's bar-by-bar load(), and there is no per-bar column mapping as in PandasData.
+    # Missing open/high/low default to close and a missing volume to 0.
+
+    def start(self):
+        super().start()
+        arrays = self.p.dataname
+        close = np.asarray(arrays["close"], dtype="float64")
+        columns = {"datetime": to_bt_datetime(arrays["time"])}
+        for name in OHLCV:
+            values = arrays.get(name)
+            if values is None:
+                values = np.zeros(len(close)) if name == "volume" else close
+            columns[name] = np.asarray(values, dtype="float64")
+        columns["openinterest"] = np.full(len(close), np.nan)
+        self._columns = columns
+        self._row = 0
+
+    def _bounds(self) -> slice:
+        # fromdate/todate as a row slice; times are sorted, so two binary searches suffice
+        dt = self._columns["datetime"]
+        return slice(int(np.searchsorted(dt, self.fromdate, side="left")),
+                     int(np.searchsorted(dt, self.todate, side="right")))
+
+    def _load(self) -> bool:
+        if self._row >= len(self._columns["datetime"]):
+            return False
+        for name, values in self._columns.items():
+            getattr(self.lines, name)[0] = values[self._row]
+        self._row += 1
+        return True
+
+    def preload(self):
+        # Filters (resample/replay), input timezones and qbuffer mode need the generic path
+        lines = [getattr(self.lines, name) for name in self._columns]
+        if (self._filters or self._ffilters or self._tzinput or
+                any(line.mode != line.UnBounded for line in lines)):
+            return super().preload()
+        rows = self._bounds()
+        for line, values in zip(lines, self._columns.values()):
+            line.array = array("d", np.ascontiguousarray(values[rows], dtype="float64").tobytes())
+        self._row = len(self._columns["datetime"])
+        self.home()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **kwargs) -> "NumpyData":
+        # Bars with a "time" (or "datetime") column or a DatetimeIndex; column names are case-insensitive
+        df = df.rename(columns=str.lower)
+        column = "time" if "time" in df else "datetime" if "datetime" in df else None
+        times = pd.to_datetime(df[column] if column else df.index, utc=True)
+        arrays = {name: df[name].to_numpy(dtype="float64") for name in OHLCV if name in df}
+        return cls(dataname={"time": times, **arrays}, **kwargs)
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], **kwargs) -> Dict[str, "NumpyData"]:
+        # One feed per ticker, keyed for BacktestEngine.run_backtest(data={...})
+        return {ticker: cls.from_frame(df, **kwargs) for ticker, df in frames.items()}
@@ -0,0 +1,164 @@
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+import json
+import math
+import os
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from backtest.engine import BacktestEngine
+from backtest.feeds import NumpyData
+from utils.logger import setup_logger
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+RESULT_COLUMNS = ["final_value", "sharpe", "max_drawdown", "trades"]
+
+
+class SharedDataset:
+    # One ticker's bars in a shared memory block: int64 ns timestamps followed by an (n, 5)
+    # float64 OHLCV matrix. Workers attach by name instead of receiving a pickled DataFrame.
+    def __init__(self, name: str, rows: int):
+        self.name = name
+        self.rows = rows
+
+    @classmethod
+    def create(cls, df: pd.DataFrame) -> tuple:
+        df = df.rename(columns=str.lower)
+        times = pd.to_datetime(df["time"] if "time" in df else df.index, utc=True)
+        rows = len(df)
+        shm = shared_memory.SharedMemory(create=True, size=max(rows * 8 * (1 + len(OHLCV)), 1))
+        np.ndarray(rows, dtype="int64", buffer=shm.buf)[:] = times.astype("datetime64[ns, UTC]").astype("int64")
+        np.ndarray((rows, len(OHLCV)), dtype="float64", buffer=shm.buf, offset=rows * 8)[:] = df[OHLCV].to_numpy("float64")
+        return cls(shm.name, rows), shm
+
+    def attach(self) -> Dict[str, np.ndarray]:
+        shm = shared_memory.SharedMemory(name=self.name)
+        times = np.ndarray(self.rows, dtype="int64", buffer=shm.buf)
+        values = np.ndarray((self.rows, len(OHLCV)), dtype="float64", buffer=shm.buf, offset=self.rows * 8)
+        # backtrader keeps its own line buffers, so the feed arrays are copies and the block released
+        arrays = {"time": times.astype("datetime64[ns]")}
+        arrays.update({name: values[:, i].copy() for i, name in enumerate(OHLCV)})
+        del times, values
+        shm.close()
+        return arrays
+
+
+def expand_grid(param_grid: Dict[str, list]) -> List[dict]:
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in product(*(param_grid[n] for n in names))]
+
+
+def _job_key(ticker: str, params: dict) -> str:
+    return f"{ticker}|{json.dumps(params, sort_keys=True)}"
+
+
+_worker = {}
+
+
+def _init_worker(datasets: Dict[str, SharedDataset], strategy, cash: float, commission: float):
+    _worker.update(datasets=datasets, arrays={}, strategy=strategy,
+                   engine=BacktestEngine(cash=cash, commission=commission))
+
+
+def _run_job(ticker: str, params: dict) -> dict:
+    arrays = _worker["arrays"]
+    if ticker not in arrays:
+        arrays.clear()
+        arrays[ticker] = _worker["datasets"][ticker].attach()
+    data = NumpyData(dataname=arrays[ticker], timeframe=bt.TimeFrame.Minutes)
+    analyzers = {
+        "sharpe": (bt.analyzers.SharpeRatio, {"timeframe": bt.TimeFrame.Minutes, "riskfreerate": 0.0}),
+        "drawdown": (bt.analyzers.DrawDown, {}),
+        "trades": (bt.analyzers.TradeAnalyzer, {}),
+    }
+    cerebro = _worker["engine"].run_backtest(data, _worker["strategy"], analyzers=analyzers, **params)
+    results = cerebro.runstrats[0][0].analyzers
+    sharpe = results.sharpe.get_analysis().get("sharperatio")
+    trades = results.trades.get_analysis()
+    return {
+        "ticker": ticker,
+        **params,
+        "final_value": cerebro.broker.getvalue(),
+        "sharpe": sharpe if sharpe is not None else math.nan,
+        "max_drawdown": results.drawdown.get_analysis().max.drawdown,
+        "trades": trades.total.total if "total" in trades else 0,
+    }
+
+
+class ParameterSweep:
+    # Runs every (ticker, parameter set) combination of a strategy across a process pool.
+    # Each dataset is placed in shared memory once; finished runs are appended to a JSON-lines
+    # checkpoint so an interrupted sweep resumes where it stopped.
+    def __init__(self, strategy: bt.Strategy, param_grid: Dict[str, list], cash: float = 10000.0,
+                 commission: float = 0.001, processes: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None):
+        self.strategy = strategy
+        self.param_grid = param_grid
+        self.cash = cash
+        self.commission = commission
+        self.processes = processes or os.cpu_count()
+        self.checkpoint_path = checkpoint_path
+        self.logger = setup_logger(__name__)
+
+    def run(self, datasets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        done = self._load_checkpoint()
+        jobs = [(ticker, params) for ticker in datasets for params in expand_grid(self.param_grid)
+                if _job_key(ticker, params) not in done]
+        self.logger.info(f"Sweep: {len(jobs)} runs to go, {len(done)} restored from checkpoint")
+        results = list(done.values())
+        if jobs:
+            self._run_jobs(datasets, jobs, results)
+        columns = ["ticker", *self.param_grid, *RESULT_COLUMNS]
+        if not results:
+            # every run failed (e.g. a strategy that needs more feeds); keep the frame's shape
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame(results, columns=columns).sort_values(["ticker", *self.param_grid], ignore_index=True)
+
+    def _run_jobs(self, datasets: Dict[str, pd.DataFrame], jobs: List[tuple], results: List[dict]):
+        blocks = []
+        try:
+            shared = {}
+            for ticker in {ticker for ticker, _ in jobs}:
+                shared[ticker], shm = SharedDataset.create(datasets[ticker])
+                blocks.append(shm)
+            with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                     initargs=(shared, self.strategy, self.cash, self.commission)) as pool:
+                # Jobs are submitted ticker by ticker so each worker mostly reuses the arrays it attached
+                futures = {pool.submit(_run_job, ticker, params): (ticker, params) for ticker, params in jobs}
+                for future in as_completed(futures):
+                    ticker, params = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Sweep run {ticker} {params} failed: {e}")
+                        continue
+                    results.append(result)
+                    self._checkpoint(result)
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    def _load_checkpoint(self) -> Dict[str, dict]:
+        done = {}
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return done
+        with open(self.checkpoint_path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # a crash can leave a truncated last line
+                    continue
+                params = {name: result[name] for name in self.param_grid}
+                done[_job_key(result["ticker"], params)] = result
+        return done
+
+    def _checkpoint(self, result: dict):
+        if not self.checkpoint_path:
+            return
+        with open(self.checkpoint_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
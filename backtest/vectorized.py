@@ -0,0 +1,99 @@
+
+from typing import Dict
+import numpy as np
+import pandas as pd
+from utils.logger import setup_logger
+from utils.metrics import BACKTEST_SECONDS, timed
+
+
+def performance_stats(value: np.ndarray, initial: float, fills: int = 0) -> Dict[str, float]:
+    # Summary statistics of an equity curve; Sharpe is per bar and not annualized
+    if len(value) == 0:
+        return {"final_value": initial, "total_return": 0.0, "sharpe": np.nan, "max_drawdown": 0.0, "fills": fills}
+    curve = np.concatenate(([initial], value))
+    returns = curve[1:] / curve[:-1] - 1
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    peak = np.maximum.accumulate(curve)
+    return {
+        "final_value": float(value[-1]),
+        "total_return": float(value[-1] / initial - 1),
+        "sharpe": float(returns.mean() / std) if std > 0 else np.nan,
+        "max_drawdown": float(((peak - curve) / peak).max() * 100),
+        "fills": fills,
+    }
+
+
+class VectorizedResult:
+    def __init__(self, equity: pd.DataFrame, trades: pd.DataFrame, stats: Dict[str, float]):
+        self.equity = equity
+        self.trades = trades
+        self.stats = stats
+
+
+def simulate(signal: np.ndarray, fill_price: np.ndarray, close: np.ndarray, cash: float, commission: float,
+             size: float = 1.0, mode: str = "target") -> Dict[str, np.ndarray]:
+    # Array kernel behind VectorizedBacktester.run; accepts (read-only) views of longer series
+    if mode == "target":
+        orders = np.diff(signal * size, prepend=0.0)
+    elif mode == "orders":
+        orders = signal * size
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+
+    # orders from bar t execute on bar t + 1
+    executed = np.zeros_like(orders)
+    executed[1:] = orders[:-1]
+    exec_price = np.where(executed != 0, fill_price, 0.0)
+    traded_value = executed * exec_price
+    fees = np.abs(traded_value) * commission
+
+    position = np.cumsum(executed)
+    cash = cash - np.cumsum(traded_value + fees)
+    return {
+        "executed": executed,
+        "exec_price": exec_price,
+        "traded_value": traded_value,
+        "commission": fees,
+        "position": position,
+        "cash": cash,
+        "value": cash + position * close,
+    }
+
+
+class VectorizedBacktester:
+    # Array-only backtester for strategies that already produce a "signal" column
+    # (MomentumStrategy, MeanReversionStrategy, ArbitrageStrategy).
+    # Execution follows backtrader's defaults: an order created on bar t fills at the open of bar
+    # t + 1, commission is a fraction of the traded value, and the last bar's order never fills.
+    # Orders are not rejected for lack of cash; min_cash in the stats shows whether that happened.
+    def __init__(self, cash: float = 10000.0, commission: float = 0.001):
+        self.cash = cash
+        self.commission = commission
+        self.logger = setup_logger(__name__)
+
+    @timed(BACKTEST_SECONDS, engine="vectorized")
+    def run(self, df: pd.DataFrame, size: float = 1.0, mode: str = "target",
+            price_column: str = "close") -> VectorizedResult:
+        # mode="target": signal * size is the position to hold (1 long, -1 short, 0 flat).
+        # mode="orders": every non-zero signal sends a market order of signal * size, like
+        # MomentumBTStrategy calling buy()/sell() on each bar.
+        signal = np.nan_to_num(df["signal"].to_numpy(dtype="float64"))
+        close = df[price_column].to_numpy(dtype="float64")
+        fill_price = df["open"].to_numpy(dtype="float64") if "open" in df else close
+        times = df["time"].to_numpy() if "time" in df else df.index.to_numpy()
+
+        sim = simulate(signal, fill_price, close, self.cash, self.commission, size, mode)
+        filled = np.flatnonzero(sim["executed"])
+        trades = pd.DataFrame({
+            "time": times[filled],
+            "size": sim["executed"][filled],
+            "price": sim["exec_price"][filled],
+            "value": sim["traded_value"][filled],
+            "commission": sim["commission"][filled],
+        })
+        equity = pd.DataFrame({"time": times, "position": sim["position"], "cash": sim["cash"], "value": sim["value"]})
+        stats = performance_stats(sim["value"], self.cash, fills=len(filled))
+        stats["min_cash"] = float(sim["cash"].min()) if len(sim["cash"]) else self.cash
+        self.logger.info(f"Vectorized backtest: {len(df)} bars, {len(filled)} fills, "
+                         f"final portfolio value: {stats['final_value']:.2f}")
+        return VectorizedResult(equity, trades, stats)
@@ -0,0 +1,157 @@
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import math
+import os
+import numpy as np
+import pandas as pd
+from backtest.vectorized import performance_stats, simulate
+from strategies.indicators import StrategySet
+from utils.logger import setup_logger
+
+
+def walk_forward_windows(n: int, train: int, test: int, step: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    # (train_start, test_start, test_end) bar indices; windows advance by step (default: test),
+    # so consecutive train windows overlap and test windows tile the history
+    step = step or test
+    return [(start, start + train, start + train + test) for start in range(0, n - train - test + 1, step)]
+
+
+def _score(stats: dict, metric: str) -> float:
+    value = stats[metric]
+    if metric == "max_drawdown":
+        value = -value
+    return -math.inf if value is None or np.isnan(value) else value
+
+
+_worker = {}
+
+
+def _init_worker(name: str, rows: int, names: List[str], cash: float, commission: float, size: float,
+                 mode: str, metric: str):
+    # Workers map the shared block once; every window below is a slice of these arrays, not a copy
+    shm = shared_memory.SharedMemory(name=name)
+    data = np.ndarray((2 + len(names), rows), dtype="float64", buffer=shm.buf)
+    _worker.update(shm=shm, open=data[0], close=data[1], signals=data[2:], names=names, cash=cash,
+                   commission=commission, size=size, mode=mode, metric=metric)
+
+
+def _evaluate(row: int, lo: int, hi: int) -> dict:
+    w = _worker
+    sim = simulate(w["signals"][row, lo:hi], w["open"][lo:hi], w["close"][lo:hi], w["cash"], w["commission"],
+                   w["size"], w["mode"])
+    return performance_stats(sim["value"], w["cash"], fills=int(np.count_nonzero(sim["executed"])))
+
+
+def _run_window(window: Tuple[int, int, int]) -> dict:
+    # Pick the strategy with the best train-period metric, then score it out of sample
+    train_start, test_start, test_end = window
+    metric = _worker["metric"]
+    train = [_evaluate(row, train_start, test_start) for row in range(len(_worker["names"]))]
+    best = max(range(len(train)), key=lambda row: _score(train[row], metric))
+    test = _evaluate(best, test_start, test_end)
+    return {
+        "strategy": _worker["names"][best],
+        f"train_{metric}": train[best][metric],
+        **{f"test_{key}": value for key, value in test.items()},
+    }
+
+
+def summarize(windows: pd.DataFrame, overlapping: bool = False) -> Dict[str, float]:
+    # Aggregate out-of-sample performance across windows. Returns are only compounded when the
+    # test windows tile the history; overlapping windows would count the same bars several times.
+    returns = windows["test_total_return"].to_numpy()
+    if len(returns) == 0:
+        return {"windows": 0}
+    summary = {"windows": len(returns)}
+    if not overlapping:
+        summary["compounded_return"] = float(np.prod(1 + returns) - 1)
+    return {
+        **summary,
+        "mean_return": float(returns.mean()),
+        "median_return": float(np.median(returns)),
+        "positive_windows": float((returns > 0).mean()),
+        "mean_sharpe": float(windows["test_sharpe"].mean()),
+        "worst_drawdown": float(windows["test_max_drawdown"].max()),
+        "fills": int(windows["test_fills"].sum()),
+    }
+
+
+class WalkForwardResult:
+    def __init__(self, windows: pd.DataFrame, summary: Dict[str, float]):
+        self.windows = windows
+        self.summary = summary
+
+
+class WalkForward:
+    # Walk-forward analysis over one ticker's history. All candidate strategies are evaluated
+    # once over the full series with StrategySet, so rolling indicators are computed a single
+    # time and windows never start cold. Each window then picks the candidate with the best
+    # train-period metric and runs it on the following test period with the vectorized
+    # backtester's kernel. Windows run in a process pool over one shared memory block.
+    def __init__(self, strategies: Dict[str, object], cash: float = 10000.0, commission: float = 0.001,
+                 size: float = 1.0, mode: str = "target", metric: str = "sharpe",
+                 processes: Optional[int] = None):
+        self.strategies = StrategySet(strategies)
+        self.cash = cash
+        self.commission = commission
+        self.size = size
+        self.mode = mode
+        self.metric = metric
+        self.processes = processes or os.cpu_count()
+        self.logger = setup_logger(__name__)
+
+    def run(self, df: pd.DataFrame, train_bars: int, test_bars: int, step: Optional[int] = None) -> WalkForwardResult:
+        df = df.rename(columns=str.lower)
+        times = pd.DatetimeIndex(pd.to_datetime(df["time"] if "time" in df else df.index, utc=True))
+        close = df["close"].to_numpy(dtype="float64")
+        windows = walk_forward_windows(len(df), train_bars, test_bars, step)
+        names = list(self.strategies.strategies)
+        signals, _ = self.strategies.evaluate(close)
+        self.logger.info(f"Walk-forward: {len(windows)} windows, {len(names)} candidate strategies, {len(df)} bars")
+        if not windows:
+            return WalkForwardResult(pd.DataFrame(), {"windows": 0})
+
+        rows = len(df)
+        shm = shared_memory.SharedMemory(create=True, size=max((2 + len(names)) * rows * 8, 1))
+        try:
+            data = np.ndarray((2 + len(names), rows), dtype="float64", buffer=shm.buf)
+            data[0] = df["open"].to_numpy(dtype="float64") if "open" in df else close
+            data[1] = close
+            data[2:] = signals
+            del data
+            initargs = (shm.name, rows, names, self.cash, self.commission, self.size, self.mode, self.metric)
+            if self.processes == 1 or len(windows) < 2:
+                _init_worker(*initargs)
+                try:
+                    results = [_run_window(window) for window in windows]
+                finally:
+                    # drop the array views before unmapping the block
+                    worker_shm = _worker.pop("shm")
+                    _worker.clear()
+                    worker_shm.close()
+            else:
+                with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                         initargs=initargs) as pool:
+                    chunksize = max(1, len(windows) // (4 * self.processes))
+                    results = list(pool.map(_run_window, windows, chunksize=chunksize))
+        finally:
+            shm.close()
+            shm.unlink()
+
+        index = np.array(windows, dtype=np.int64).reshape(-1, 3)
+        table = pd.DataFrame({
+            "train_start": times[index[:, 0]],
+            "test_start": times[index[:, 1]],
+            "test_end": times[index[:, 2] - 1],
+        })
+        table = pd.concat([table, pd.DataFrame(results, index=table.index)], axis=1)
+        summary = summarize(table, overlapping=(step or test_bars) < test_bars)
+        if "compounded_return" in summary:
+            self.logger.info(f"Walk-forward done: compounded out-of-sample return "
+                             f"{summary['compounded_return']:.4%} over {len(windows)} windows")
+        else:
+            self.logger.info(f"Walk-forward done: mean out-of-sample return {summary['mean_return']:.4%} "
+                             f"over {len(windows)} overlapping windows")
+        return WalkForwardResult(table, summary)
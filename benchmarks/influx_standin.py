@@ -0,0 +1,106 @@
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+import gzip
+import json
+import re
+import threading
+import pandas as pd
+
+_TICKER = re.compile(r'r\["ticker"\] == "([^"]+)"')
+
+
+class InfluxStandIn:
+    # Minimal local stand-in for the InfluxDB v2 HTTP API: accepts line-protocol writes and
+    # answers Flux queries for a ticker with annotated CSV built from a registered frame, so the
+    # client, serialization and HTTP costs are measured without a database.
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.writes = 0
+        self.lines = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "InfluxStandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _record_write(self, body: bytes):
+        with self._lock:
+            self.writes += 1
+            self.bytes += len(body)
+            self.lines += body.count(b"\n") + 1 if body else 0
+
+    def _query_csv(self, flux: str) -> bytes:
+        # One table per requested ticker that has a registered frame; range, field projection
+        # and aggregation in the query are ignored
+        tables = []
+        for ticker in dict.fromkeys(_TICKER.findall(flux)):
+            df = self.frames.get(ticker)
+            if df is None or df.empty:
+                continue
+            times = pd.to_datetime(df["time"], utc=True).dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+            rows = (f",,{len(tables)},2000-01-01T00:00:00Z,2100-01-01T00:00:00Z," + times + ",stock_data," + ticker
+                    + "," + df["close"].astype(str) + "," + df["high"].astype(str) + "," + df["low"].astype(str)
+                    + "," + df["open"].astype(str) + "," + df["volume"].astype("int64").astype(str))
+            tables.append("\r\n".join(rows))
+        if not tables:
+            return b"\r\n"
+        header = (
+            "#datatype,string,long,dateTime:RFC3339,dateTime:RFC3339,dateTime:RFC3339,string,string,double,double,double,double,long\r\n"
+            "#group,false,false,true,true,false,true,true,false,false,false,false,false\r\n"
+            "#default,_result,,,,,,,,,,,\r\n"
+            ",result,table,_start,_stop,_time,_measurement,ticker,close,high,low,open,volume\r\n"
+        )
+        return (header + "\r\n".join(tables) + "\r\n\r\n").encode()
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _body(self) -> bytes:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                return body
+
+            def do_GET(self):
+                self.send_response(204 if self.path.startswith("/ping") else 404)
+                self.end_headers()
+
+            def do_POST(self):
+                if standin.latency:
+                    threading.Event().wait(standin.latency)
+                body = self._body()
+                if self.path.startswith("/api/v2/write"):
+                    standin._record_write(body)
+                    self.send_response(204)
+                    self.end_headers()
+                elif self.path.startswith("/api/v2/query"):
+                    payload = standin._query_csv(json.loads(body)["query"])
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/csv; charset=utf-8")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+
+        return Handler
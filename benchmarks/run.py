@@ -0,0 +1,343 @@
+
+# Benchmark harness for the ingest, query, signal and backtest hot paths.
+#
+#   python -m benchmarks.run                       # quick profile, compare with benchmarks/baseline.json
+#   python -m benchmarks.run --profile full --output results.json
+#   python -m benchmarks.run --save-baseline       # record the current numbers as the new baseline
+#
+# Exits with status 1 when any case's throughput falls more than --tolerance below the baseline,
+# and with status 2 when there is no baseline file (unless --allow-missing-baseline is given).
+#
+# Throughput is only comparable on the hardware that recorded the baseline. The default tolerance
+# (50%) sits above the 30-40% run-to-run spread measured on a shared single-CPU runner; use a
+# tighter --tolerance on dedicated machines. To regenerate baseline.json for the CI runners, run
+#
+#   python -m benchmarks.run --save-baseline
+#
+# as a CI job on that runner type with nothing else scheduled, and commit the written file;
+# its "meta" records the platform and library versions, and a mismatch is reported on compare.
+
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.influx_standin import InfluxStandIn
+from benchmarks.synthetic import make_ohlcv, make_universe
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_TOLERANCE = 0.5
+
+# bars: single-series sizes; tickers: universe sizes (one trading day of minute bars each);
+# backtest_bars / stream_bars: backtrader and realtime sizes, kept lower because both handle
+# one bar at a time in Python
+PROFILES = {
+    "quick": {"bars": [1_000, 10_000], "tickers": [2, 10], "backtest_bars": [1_000], "stream_bars": [500],
+              "repeat": 5},
+    "full": {"bars": [1_000, 100_000, 1_000_000, 10_000_000], "tickers": [2, 100, 1000],
+             "backtest_bars": [1_000, 100_000], "stream_bars": [500, 5_000], "repeat": 5},
+}
+BARS_PER_DAY = 390
+
+CASES: Dict[str, tuple] = {}
+
+
+def case(name: str, sizes: str):
+    # Register a benchmark; setup(size) returns (items processed per call, callable)
+    def register(setup: Callable):
+        CASES[name] = (sizes, setup)
+        return setup
+    return register
+
+
+@case("momentum.generate_signals", "bars")
+def _momentum(bars):
+    from strategies.momentum import MomentumStrategy
+    df, strategy = make_ohlcv(bars), MomentumStrategy(window=10)
+    return bars, lambda: strategy.generate_signals(df.copy())
+
+
+@case("mean_reversion.generate_signals", "bars")
+def _mean_reversion(bars):
+    from strategies.mean_reversion import MeanReversionStrategy
+    df, strategy = make_ohlcv(bars), MeanReversionStrategy(window=20)
+    return bars, lambda: strategy.generate_signals(df.copy())
+
+
+@case("arbitrage.generate_signals", "bars")
+def _arbitrage(bars):
+    from strategies.arbitrage import ArbitrageStrategy
+    df1, df2, strategy = make_ohlcv(bars, seed=1), make_ohlcv(bars, seed=2), ArbitrageStrategy("A", "B", 0.005)
+    return bars, lambda: strategy.generate_signals(df1, df2)
+
+
+@case("arbitrage.scan_pairs", "tickers")
+def _scan_pairs(tickers):
+    from strategies.arbitrage import ArbitrageStrategy
+    strategy = ArbitrageStrategy("A", "B", 0.005)
+    panel = strategy.build_panel(make_universe(tickers, BARS_PER_DAY))
+    return tickers * (tickers - 1) // 2, lambda: strategy.scan_pairs(panel, zscore_window=30)
+
+
+@case("data_handler.to_line_protocol", "bars")
+def _line_protocol(bars):
+    from utils.data_handler import to_line_protocol
+    df = make_ohlcv(bars, capitalized=True)
+    return bars, lambda: to_line_protocol(df, "AAPL")
+
+
+@case("data_handler.write_to_influxdb", "bars")
+def _write_per_row(bars):
+    # The original per-row Point path, for comparison with write_bulk_to_influxdb
+    from utils.data_handler import DataHandler
+    df = make_ohlcv(min(bars, 100_000), capitalized=True)
+    handler = DataHandler(url=_standin().url, token="benchmark")
+    return len(df), lambda: handler.write_to_influxdb(df, "AAPL")
+
+
+@case("data_handler.write_bulk_to_influxdb", "tickers")
+def _write_bulk(tickers):
+    from utils.data_handler import DataHandler
+    frames = make_universe(tickers, BARS_PER_DAY, capitalized=True)
+    handler = DataHandler(url=_standin().url, token="benchmark")
+    return tickers * BARS_PER_DAY, lambda: handler.write_bulk_to_influxdb(frames, invalidate_cache=False)
+
+
+@case("data_handler.query_influxdb", "bars")
+def _query(bars):
+    from utils.data_handler import DataHandler
+    standin = _standin()
+    standin.frames["AAPL"] = make_ohlcv(min(bars, 1_000_000))
+    handler = DataHandler(url=standin.url, token="benchmark")
+    return len(standin.frames["AAPL"]), lambda: handler.query_influxdb("AAPL", start_time="-3650d")
+
+
+@case("data_handler.query_cached", "bars")
+def _query_cached(bars):
+    # Steady state: every call is a tail refresh against an already cached history
+    from utils.data_handler import DataHandler
+    standin = _standin()
+    bars = min(bars, 1_000_000)
+    start = pd.Timestamp.now(tz="UTC").floor("1min") - pd.Timedelta(minutes=bars)
+    df = make_ohlcv(bars, start=str(start))
+    standin.frames["AAPL"] = df
+    handler = DataHandler(url=standin.url, token="benchmark")
+    handler.cache.ttl = 0
+    handler.query_cached("AAPL", start_time="-3650d")
+    # the stand-in ignores the range, so serve only the newest bars for tail queries
+    standin.frames["AAPL"] = df.tail(5)
+    return bars, lambda: handler.query_cached("AAPL", start_time="-3650d")
+
+
+@case("backtest.run_backtest", "backtest_bars")
+def _backtest(bars):
+    import backtrader as bt
+    from backtest.engine import BacktestEngine, MomentumBTStrategy
+    df = make_ohlcv(bars).set_index("time")[["open", "high", "low", "close", "volume"]]
+    engine = BacktestEngine(cash=1e9, commission=0.001)
+    return bars, lambda: engine.run_backtest(bt.feeds.PandasData(dataname=df), MomentumBTStrategy)
+
+
+@case("backtest.portfolio", "tickers")
+def _portfolio(tickers):
+    from backtest.engine import BacktestEngine, MeanReversionBTStrategy, MomentumBTStrategy
+    from backtest.feeds import NumpyData
+    frames = make_universe(tickers, BARS_PER_DAY)
+    engine = BacktestEngine(cash=1e9, commission=0.001)
+    strategies = [MomentumBTStrategy, MeanReversionBTStrategy]
+    return tickers * BARS_PER_DAY, lambda: engine.run_backtest(NumpyData.from_frames(frames), strategies,
+                                                               stdstats=False)
+
+
+@case("backtest.vectorized", "bars")
+def _vectorized(bars):
+    from backtest.vectorized import VectorizedBacktester
+    from strategies.momentum import MomentumStrategy
+    signals = MomentumStrategy(window=10).generate_signals(make_ohlcv(bars))
+    engine = VectorizedBacktester(cash=1e9, commission=0.001)
+    return bars, lambda: engine.run(signals, mode="orders")
+
+
+@case("main.run_realtime", "stream_bars")
+def _realtime(bars):
+    # Replayed bars for two tickers through the bus, strategies and a no-op sink;
+    # latency percentiles are per bar rather than per call
+    from main import run_realtime
+    from utils.event_bus import ReplaySource
+
+    class NullSink:
+        def write_bulk_to_influxdb(self, frames, invalidate_cache=True, **options):
+            pass
+
+    frames = {"AAPL": make_ohlcv(bars, seed=1), "SPY": make_ohlcv(bars, seed=2)}
+    logger = logging.getLogger("benchmark")
+
+    def run():
+        latency = asyncio.run(run_realtime(NullSink(), "AAPL", "SPY", None, None, logger,
+                                           replay=ReplaySource(frames)))
+        return latency.summary()
+    return 2 * bars, run
+
+
+_standins: List[InfluxStandIn] = []
+
+
+def _standin() -> InfluxStandIn:
+    if not _standins:
+        _standins.append(InfluxStandIn().__enter__())
+    return _standins[0]
+
+
+MIN_REPETITION_SECONDS = 0.02
+
+
+def measure(fn: Callable, items: int, repeat: int) -> dict:
+    # Sub-millisecond cases are run several times per repetition (as timeit does), so every
+    # timing spans at least MIN_REPETITION_SECONDS instead of being mostly timer and scheduler noise
+    start = perf_counter()
+    fn()
+    number = max(1, int(MIN_REPETITION_SECONDS / max(perf_counter() - start, 1e-9)))
+    times = []
+    per_item = None
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            out = fn()
+        times.append((perf_counter() - start) / number)
+        if isinstance(out, dict) and "p50_ms" in out:
+            per_item = out
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times_ms = np.array(times) * 1e3
+    result = {
+        "items": items,
+        "throughput": items / float(np.median(times)),
+        # fastest repetition; less sensitive to scheduler noise, so baselines are compared on it
+        "best_throughput": items / float(np.min(times)),
+        "p50_ms": float(np.percentile(times_ms, 50)),
+        "p95_ms": float(np.percentile(times_ms, 95)),
+        "p99_ms": float(np.percentile(times_ms, 99)),
+        "peak_mb": peak / 1e6,
+    }
+    if per_item:
+        result.update({f"item_{k}": v for k, v in per_item.items() if k.endswith("_ms")})
+    return result
+
+
+def run_benchmarks(profile: dict, only: Optional[str] = None) -> Dict[str, dict]:
+    results = {}
+    for name, (sizes, setup) in CASES.items():
+        if only and only not in name:
+            continue
+        for size in profile[sizes]:
+            key = f"{name}[{sizes}={size}]"
+            items, fn = setup(size)
+            results[key] = measure(fn, items, profile["repeat"])
+            print(f"{key:60s} {results[key]['throughput']:>14,.0f} items/s  "
+                  f"p50 {results[key]['p50_ms']:9.2f} ms  peak {results[key]['peak_mb']:8.1f} MB", flush=True)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    # Best-of-repeat throughput against the baseline (median throughput for older baselines)
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        reference = baseline[key]
+        metric = "best_throughput" if "best_throughput" in result and "best_throughput" in reference else "throughput"
+        actual, expected = result[metric], reference[metric]
+        if actual < expected * (1 - tolerance):
+            regressions.append(f"{key}: {actual:,.0f} items/s vs baseline {expected:,.0f} "
+                               f"({actual / expected - 1:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", help="run only cases whose name contains this string")
+    parser.add_argument("--repeat", type=int, help="timed repetitions per case")
+    parser.add_argument("--output", help="write results JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--allow-missing-baseline", action="store_true",
+                        help="exit 0 when there is no baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed throughput drop, as a fraction")
+    parser.add_argument("--log", action="store_true", help="keep INFO logging from the measured code")
+    args = parser.parse_args(argv)
+
+    if not args.log:
+        logging.disable(logging.INFO)
+    profile = dict(PROFILES[args.profile])
+    if args.repeat:
+        profile["repeat"] = args.repeat
+    try:
+        results = run_benchmarks(profile, args.only)
+    finally:
+        for standin in _standins:
+            standin.__exit__(None, None, None)
+        _standins.clear()
+
+    report = {
+        "meta": {
+            "profile": args.profile,
+            "timestamp": pd.Timestamp.now(tz="UTC").isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"meta": report["meta"], "results": baseline}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 0 if args.allow_missing_baseline else 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    recorded = baseline.get("meta", {})
+    differs = [f"{key} {recorded.get(key)} vs {value}" for key, value in report["meta"].items()
+               if key in ("python", "platform", "numpy", "pandas") and recorded.get(key) != value]
+    if differs:
+        print(f"Baseline was recorded on a different setup ({'; '.join(differs)}); "
+              f"regenerate it there with --save-baseline", file=sys.stderr)
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print("\nPERFORMANCE REGRESSIONS:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        return 1
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+
+def make_ohlcv(bars: int, seed: int = 0, start: str = "2020-01-02 14:30", freq: str = "1min",
+               capitalized: bool = False) -> pd.DataFrame:
+    # Geometric random-walk minute bars in the layout of query_influxdb (or fetch_yfinance_data
+    # with capitalized=True)
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 5e-4, bars)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 2e-4, bars)) * close
+    df = pd.DataFrame({
+        "time": pd.date_range(start, periods=bars, freq=freq, tz="UTC"),
+        "close": close,
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "volume": rng.integers(100, 10000, bars).astype("float64"),
+    })
+    if capitalized:
+        df = df.rename(columns={c: c.capitalize() for c in ["close", "open", "high", "low", "volume"]})
+    return df
+
+
+def make_universe(tickers: int, bars: int, seed: int = 0, capitalized: bool = False) -> Dict[str, pd.DataFrame]:
+    return {f"T{i:04d}": make_ohlcv(bars, seed=seed + i, capitalized=capitalized) for i in range(tickers)}
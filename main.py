@@ -1,205 +1,311 @@
-from utils.data_handler import DataHandler
-from strategies.momentum import MomentumStrategy
-from strategies.mean_reversion import MeanReversionStrategy
-from strategies.arbitrage import ArbitrageStrategy
-from backtest.engine import BacktestEngine, MomentumBTStrategy
-import backtrader as bt
-import pandas as pd
-from utils.logger import setup_logger
-import asyncio
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+# Command line entry point:
+#
+#   python main.py ingest [--period 5d] [--interval 1m]      # fetch history, backfill InfluxDB and the local store
+#   python main.py backtest [--every 5m] [--walk-forward] [--plot backtest_plot.png]
+#   python main.py realtime                                  # stream Alpaca bars through the strategies
+#   python main.py dashboard [--port 8050]
+#
+# Each subcommand imports only what it uses (backtrader, Dash, Alpaca, yfinance and the InfluxDB
+# client are all deferred), and logs its cold-start time and peak memory once it is ready.
+import time
+
+STARTED = time.perf_counter()
+
+from typing import List, Optional
+import argparse
 import os
-from dash import Dash, html, dcc, Input, Output
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import sys
+from utils.logger import RateLimitedLogger, setup_logger
+from utils.metrics import STARTUP_SECONDS
+
 
+def report_startup(logger, command: str) -> float:
+    # Seconds from loading main.py until the subcommand is ready to work, plus peak RSS so far
+    seconds = time.perf_counter() - STARTED
+    STARTUP_SECONDS.set(seconds, command=command)
+    try:
+        import resource
+        peak = f", peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+    except ImportError:
+        peak = ""
+    logger.info(f"{command} ready after {seconds:.2f}s{peak}")
+    return seconds
 
-def run_backtest(data_handler, ticker1, logger):
-    # Run backtest on historical data 
-    df_from_influx1 = data_handler.query_influxdb(ticker1, start_time="-5d")
+
+def run_backtest(data_handler, ticker1, logger, every=None, plot=None):
+    # Run backtest on historical data, from the local store when it has the bars.
+    # every (e.g. "5m", "1h") backtests on coarser bars resampled by InfluxDB instead.
+    # plot is an optional image path for backtrader's chart of the run.
+    import pandas as pd
+    from backtest.engine import BacktestEngine, MomentumBTStrategy
+    from backtest.feeds import NumpyData
+    if every is not None:
+        bars = data_handler.query_bars([ticker1], start_time="-5d", every=every)
+        df_from_influx1 = None if bars is None else bars.loc[ticker1].reset_index()
+    else:
+        end = pd.Timestamp.now(tz="UTC")
+        start = end - pd.Timedelta("5d")
+        df_from_influx1 = None
+        if data_handler.store_covers(ticker1, start, end):
+            df_from_influx1 = data_handler.read_from_store(ticker1, start=start)
+        if df_from_influx1 is None:
+            df_from_influx1 = data_handler.query_cached(ticker1, start_time="-5d")
+        if df_from_influx1 is None:
+            # InfluxDB is unavailable: backtest whatever the store has, and say so below
+            df_from_influx1 = data_handler.read_from_store(ticker1, start=start)
+            if df_from_influx1 is not None:
+                logger.warning(f"Local store only partially covers the last 5 days of {ticker1}")
     if df_from_influx1 is None:
         logger.error(f"Failed to retrieve data for {ticker1}. Exiting backtest.")
         return
-    
+    logger.info(f"Backtesting {ticker1} on {len(df_from_influx1)} bars from "
+                f"{df_from_influx1['time'].iloc[0]} to {df_from_influx1['time'].iloc[-1]}")
+
     # Prepare data for backtrader
     df_bt = df_from_influx1.rename(columns={"time": "datetime"})
     df_bt['datetime'] = pd.to_datetime(df_bt['datetime'], utc=True)
     df_bt = df_bt[['datetime', 'open', 'high', 'low', 'close', 'volume']]
     df_bt = df_bt.dropna()
-    
+
     logger.info(f"Backtrader DataFrame dtypes:\n{df_bt.dtypes}")
     logger.info(f"Sample data:\n{df_bt.head()}")
-    
-    data_feed = bt.feeds.PandasData(
-        dataname=df_bt,
-        datetime=0,
-        open=1,
-        high=2,
-        low=3,
-        close=4,
-        volume=5
-    )
-    
+
+    data_feed = NumpyData.from_frame(df_bt)
+
     # Backtest momentum strategy
     engine = BacktestEngine(cash=10000.0, commission=0.001)
     cerebro = engine.run_backtest(data_feed, MomentumBTStrategy)
-    
+
     # backtest plot
-    cerebro.plot()
-    
+    if plot:
+        import matplotlib
+        matplotlib.use('Agg')
+        # importing pyplot pins Agg; backtrader.plot would otherwise switch to TkAgg
+        import matplotlib.pyplot  # noqa: F401
+        cerebro.plot(iplot=False)[0][0].savefig(plot)
+        logger.info(f"Saved backtest plot to {plot}")
+    return cerebro
+
 
-async def run_realtime(data_handler, ticker1, ticker2, api_key, secret_key, logger):
+def run_walk_forward(data_handler, ticker1, logger, train_bars=780, test_bars=195, step=None):
+    # Walk-forward validation over all locally stored history: each window picks the best
+    # momentum/mean-reversion variant on train_bars and scores it on the next test_bars
+    from backtest.walk_forward import WalkForward
+    from strategies.mean_reversion import MeanReversionStrategy
+    from strategies.momentum import MomentumStrategy
+    df = data_handler.read_from_store(ticker1)
+    if df is None:
+        df = data_handler.query_cached(ticker1, start_time="-5d")
+    if df is None:
+        logger.error(f"Failed to retrieve data for {ticker1}. Exiting walk-forward.")
+        return None
+    candidates = {f"momentum_{w}": MomentumStrategy(window=w) for w in (5, 10, 20, 40)}
+    candidates.update({f"mean_reversion_{k}": MeanReversionStrategy(window=20, std_dev=k) for k in (1.5, 2.0, 2.5)})
+    result = WalkForward(candidates, cash=10000.0, commission=0.001).run(df, train_bars, test_bars, step)
+    logger.info(f"Walk-forward windows (last 5):\n{result.windows.tail()}")
+    logger.info(f"Walk-forward summary: {result.summary}")
+    return result
+
+
+def log_signals(data_handler, ticker1, ticker2, logger) -> bool:
+    # Latest momentum, mean-reversion and arbitrage signals on the bars in InfluxDB
+    from strategies.arbitrage import ArbitrageStrategy
+    from strategies.indicators import StrategySet
+    from strategies.mean_reversion import MeanReversionStrategy
+    from strategies.momentum import MomentumStrategy
+    df_from_influx1 = data_handler.query_cached(ticker1, start_time="-5d")
+    df_from_influx2 = data_handler.query_cached(ticker2, start_time="-5d")
+    if df_from_influx1 is None or df_from_influx2 is None:
+        logger.error("Failed to retrieve data. Exiting.")
+        return False
+
+    # Momentum and mean reversion share one pass over ticker1's closes
+    strategies = StrategySet({
+        "momentum": MomentumStrategy(window=10),
+        "mean_reversion": MeanReversionStrategy(window=20),
+    })
+    arbitrage = ArbitrageStrategy(ticker1, ticker2, threshold=0.005)
+
+    df_signals = strategies.frame(df_from_influx1)
+    df_arbitrage = arbitrage.generate_signals(df_from_influx1, df_from_influx2)
+
+    logger.info(f"Momentum signals (last 5):\n{df_signals[['time', 'close', 'momentum_10', 'momentum']].tail()}")
+    logger.info(f"Mean-reversion signals (last 5):\n{df_signals[['time', 'close', 'sma_20', 'mean_reversion']].tail()}")
+    logger.info(f"Arbitrage signals (last 5):\n{df_arbitrage[['time', 'close_ticker1', 'close_ticker2', 'spread', 'signal']].tail()}")
+    return True
+
+
+async def run_realtime(data_handler, ticker1, ticker2, api_key, secret_key, logger, replay=None):
     # Run real-time streaming and signal generation.
+    # Bars are fanned out in-process to the strategy consumer and the InfluxDB sink;
+    # pass a ReplaySource as replay to run without Alpaca.
+    import asyncio
+    from strategies.arbitrage import ArbitrageStrategy
+    from strategies.mean_reversion import MeanReversionStrategy
+    from strategies.momentum import MomentumStrategy
+    from utils.event_bus import BarBus, InfluxSink, LatencyRecorder
+    from utils.ring_buffer import BarBuffers
     # Strategies
     momentum = MomentumStrategy(window=10)
     mean_reversion = MeanReversionStrategy(window=20)
     arbitrage = ArbitrageStrategy(ticker1, ticker2, threshold=0.005)
-    
-    # Buffers for real-time data
-    buffer1 = pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
-    buffer2 = pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
-    
-    async def process_stream(ticker, buffer):
-        # Process streamed data and generate signals.
-        while True:
-            df = data_handler.query_influxdb(ticker, start_time="-5m")
-            if df is not None and not df.empty:
-                buffer = pd.concat([buffer, df]).drop_duplicates(subset="time").tail(100)
-                if ticker == ticker1:
-                    df_momentum = momentum.generate_signals(buffer.copy())
-                    df_mean_reversion = mean_reversion.generate_signals(buffer.copy())
-                    logger.info(f"{ticker} Momentum signal: {df_momentum['signal'].iloc[-1]}")
-                    logger.info(f"{ticker} Mean-reversion signal: {df_mean_reversion['signal'].iloc[-1]}")
-                if ticker == ticker2 and not buffer1.empty:
-                    df_arbitrage = arbitrage.generate_signals(buffer1, buffer)
-                    logger.info(f"Arbitrage signal: {df_arbitrage['signal'].iloc[-1]}")
-            await asyncio.sleep(60) 
-    
+
+    # Fixed-size bar history per ticker; each bar is matched to the other ticker's bar with the same timestamp
+    buffers = BarBuffers(capacity=100)
+    # per-bar signal lines are throttled; the metrics endpoint has the full latency distribution
+    signal_logger = RateLimitedLogger(logger, interval=5.0)
+    latency = LatencyRecorder()
+    bus = BarBus()
+
+    async def process_stream(queue):
+        # Generate signals as soon as each bar arrives.
+        while (bar := await queue.get()) is not None:
+            buffer = buffers[bar.ticker]
+            last = buffer.last_time
+            if not buffer.append_bar(bar) or buffer.last_time == last:
+                # an out-of-order or repeated bar: the ring buffer keeps one bar per timestamp, and
+                # the streaming windows must not count it twice either
+                latency.record(bar.received_at)
+                continue
+            if bar.ticker == ticker1:
+                signal_logger.info("%s Momentum signal: %s", bar.ticker, momentum.update(bar))
+                signal_logger.info("%s Mean-reversion signal: %s", bar.ticker, mean_reversion.update(bar))
+            # whichever leg of a minute arrives second completes the pair and gives its one signal
+            other = ticker2 if bar.ticker == ticker1 else ticker1
+            if other in buffers:
+                paired = buffers[other]
+                i = paired.index_of(bar.time)
+                if i is not None:
+                    close1, close2 = ((bar.close, paired.column('close')[i]) if bar.ticker == ticker1
+                                      else (paired.column('close')[i], bar.close))
+                    signal_logger.info("Arbitrage signal: %s", arbitrage.signal(close1, close2))
+            latency.record(bar.received_at)
+
     # Start streaming and processing tasks
-    stream_task1 = asyncio.create_task(data_handler.stream_to_influxdb(ticker1, api_key, secret_key))
-    stream_task2 = asyncio.create_task(data_handler.stream_to_influxdb(ticker2, api_key, secret_key))
-    process_task1 = asyncio.create_task(process_stream(ticker1, buffer1))
-    process_task2 = asyncio.create_task(process_stream(ticker2, buffer2))
-    
-    await asyncio.gather(stream_task1, stream_task2, process_task1, process_task2)
+    strategy_queue = bus.subscribe("strategies", tickers=[ticker1, ticker2])
+    sink = InfluxSink(data_handler)
+    sink_queue = bus.subscribe("influxdb", tickers=[ticker1, ticker2], maxsize=10000)
+    if replay is not None:
+        source_task = asyncio.create_task(replay.run(bus))
+    else:
+        source_task = asyncio.create_task(data_handler.stream_to_bus(bus, [ticker1, ticker2], api_key, secret_key))
+    process_task = asyncio.create_task(process_stream(strategy_queue))
+    sink_task = asyncio.create_task(sink.run(sink_queue))
+
+    await asyncio.gather(source_task, process_task, sink_task)
+    logger.info(f"Bar-to-signal latency: {latency.summary()}, bus: {bus.stats()}")
+    return latency
+
+
+# Each command imports its own heavy dependencies before report_startup, so the reported
+# cold start covers them even where the code below would import them later
+
+def ingest_command(args, data_handler, logger) -> int:
+    # Fetch and store historical data
+    ticker1, ticker2 = args.ticker1, args.ticker2
+    # yfinance stays deferred: it is only imported when the history cache misses
+    import influxdb_client  # noqa: F401
+    report_startup(logger, "ingest")
+    logger.info(f"Fetching historical data for {ticker1} and {ticker2}")
+    frames = data_handler.fetch_many([ticker1, ticker2], period=args.period, interval=args.interval)
+    if ticker1 not in frames or ticker2 not in frames:
+        logger.error("Failed to fetch historical data. Exiting.")
+        return 1
+    df1, df2 = frames[ticker1], frames[ticker2]
+
+    logger.info(f"{ticker1} data shape: {df1.shape}, {ticker2} data shape: {df2.shape}")
+    # Only bars InfluxDB does not already hold are written
+    data_handler.backfill_influxdb(frames)
+    data_handler.write_to_store(df1, ticker1)
+    data_handler.write_to_store(df2, ticker2)
+    return 0
+
+
+def backtest_command(args, data_handler, logger) -> int:
+    import backtest.engine  # noqa: F401
+    report_startup(logger, "backtest")
+    if args.signals and not log_signals(data_handler, args.ticker1, args.ticker2, logger):
+        return 1
+    if run_backtest(data_handler, args.ticker1, logger, every=args.every, plot=args.plot) is None:
+        return 1
+    if args.walk_forward:
+        run_walk_forward(data_handler, args.ticker1, logger, args.train_bars, args.test_bars)
+    return 0
+
+
+def realtime_command(args, data_handler, logger) -> int:
+    # Alpaca API credentials; only whether they are set is logged, never their values
+    credentials = {name: os.environ.get(name) for name in ("ALPACA_API_KEY", "ALPACA_SECRET_KEY")}
+    for name, value in credentials.items():
+        logger.info(f"{name} is {'set' if value else 'not set'}")
+    missing = [name for name, value in credentials.items() if not value]
+    if missing:
+        logger.error(f"Set {' and '.join(missing)} in the environment to stream real-time bars. Exiting.")
+        return 1
+
+    import asyncio
+    import alpaca.data.live  # noqa: F401
+    import influxdb_client  # noqa: F401
+    report_startup(logger, "realtime")
+    asyncio.run(run_realtime(data_handler, args.ticker1, args.ticker2, credentials["ALPACA_API_KEY"],
+                             credentials["ALPACA_SECRET_KEY"], logger))
+    return 0
 
-# Dash app
-app = Dash(__name__)
 
-def main():
+def dashboard_command(args, data_handler, logger) -> int:
+    from apps.dashboard import create_app
+    app = create_app(data_handler, args.ticker1, args.ticker2, start_time=args.start_time)
+    report_startup(logger, "dashboard")
+    app.run_server(debug=args.debug, host=args.host, port=args.port)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    tickers = argparse.ArgumentParser(add_help=False)
+    tickers.add_argument("--ticker1", default="AAPL")
+    tickers.add_argument("--ticker2", default="SPY")
+
+    parser = argparse.ArgumentParser(description="Algorithmic trading: ingest, backtest, stream and visualize bars")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", parents=[tickers], help="fetch history into InfluxDB and the local store")
+    ingest.add_argument("--period", default="5d")
+    ingest.add_argument("--interval", default="1m")
+    ingest.set_defaults(run=ingest_command)
+
+    backtest = commands.add_parser("backtest", parents=[tickers], help="backtest ticker1 on stored bars")
+    backtest.add_argument("--every", help="resample bars in InfluxDB first, e.g. 5m or 1h")
+    backtest.add_argument("--plot", metavar="PATH", help="save backtrader's chart of the run to PATH")
+    backtest.add_argument("--no-signals", dest="signals", action="store_false",
+                          help="skip logging the latest strategy signals")
+    backtest.add_argument("--walk-forward", action="store_true", help="also run walk-forward validation")
+    backtest.add_argument("--train-bars", type=int, default=780)
+    backtest.add_argument("--test-bars", type=int, default=195)
+    backtest.set_defaults(run=backtest_command)
+
+    realtime = commands.add_parser("realtime", parents=[tickers], help="stream live Alpaca bars through the strategies")
+    realtime.set_defaults(run=realtime_command)
+
+    dashboard = commands.add_parser("dashboard", parents=[tickers], help="serve the Dash dashboard")
+    dashboard.add_argument("--start-time", default="-1h")
+    dashboard.add_argument("--host", default="0.0.0.0")
+    dashboard.add_argument("--port", type=int, default=8050)
+    dashboard.add_argument("--debug", action="store_true")
+    dashboard.set_defaults(run=dashboard_command)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
     logger = setup_logger(__name__)
-    ticker1 = "AAPL"
-    ticker2 = "SPY"
-    
-    # Alpaca API credentials 
-    ALPACA_API_KEY = os.environ.get("ALPACA_API_KEY", "default-key-if-not-set")
-    ALPACA_SECRET_KEY = os.environ.get("ALPACA_SECRET_KEY", "default-secret-if-not-set")
-
-    # Echo the credentials
-    logger.info(f"ALPACA_API_KEY: {ALPACA_API_KEY}")
-    logger.info(f"ALPACA_SECRET_KEY: {ALPACA_SECRET_KEY}")
-    
-    # Initialize data handler
+    from utils.data_handler import DataHandler
+
+    # Initialize data handler; the InfluxDB client is only created once a command needs it
     data_handler = DataHandler()
-    
-    # Mode selection
-    RUN_BACKTEST = True
-    RUN_REALTIME = False
-    
-    if RUN_BACKTEST:
-        # Fetch and store historical data
-        logger.info(f"Fetching historical data for {ticker1} and {ticker2}")
-        df1 = data_handler.fetch_yfinance_data(ticker1, period="5d", interval="1m")
-        df2 = data_handler.fetch_yfinance_data(ticker2, period="5d", interval="1m")
-        
-        logger.info(f"{ticker1} data shape: {df1.shape}, {ticker2} data shape: {df2.shape}")
-        data_handler.write_to_influxdb(df1, ticker1)
-        data_handler.write_to_influxdb(df2, ticker2)
-        
-        # Run strategies on historical data
-        df_from_influx1 = data_handler.query_influxdb(ticker1, start_time="-5d")
-        df_from_influx2 = data_handler.query_influxdb(ticker2, start_time="-5d")
-        if df_from_influx1 is None or df_from_influx2 is None:
-            logger.error("Failed to retrieve data. Exiting.")
-            return
-        
-        momentum = MomentumStrategy(window=10)
-        mean_reversion = MeanReversionStrategy(window=20)
-        arbitrage = ArbitrageStrategy(ticker1, ticker2, threshold=0.005)
-        
-        df_momentum = momentum.generate_signals(df_from_influx1.copy())
-        df_mean_reversion = mean_reversion.generate_signals(df_from_influx1.copy())
-        df_arbitrage = arbitrage.generate_signals(df_from_influx1, df_from_influx2)
-        
-        logger.info(f"Momentum signals (last 5):\n{df_momentum[['time', 'close', 'momentum', 'signal']].tail()}")
-        logger.info(f"Mean-reversion signals (last 5):\n{df_mean_reversion[['time', 'close', 'sma', 'signal']].tail()}")
-        logger.info(f"Arbitrage signals (last 5):\n{df_arbitrage[['time', 'close_ticker1', 'close_ticker2', 'spread', 'signal']].tail()}")
-        
-        # Run backtest
-        run_backtest(data_handler, ticker1, logger)
-    else:
-        # Run real-time streaming
-        asyncio.run(run_realtime(data_handler, ticker1, ticker2, ALPACA_API_KEY, ALPACA_SECRET_KEY, logger))
-    
-    # Dash layout
-    app.layout = html.Div([
-        html.H1("Algorithmic Trading Dashboard"),
-        dcc.Interval(id='interval-component', interval=60*1000, n_intervals=0),
-        html.Div([
-            html.H3(f"{ticker1} Signals"),
-            dcc.Graph(id='ticker1-plot'),
-        ]),
-        html.Div([
-            html.H3(f"{ticker2} vs {ticker1} Arbitrage"),
-            dcc.Graph(id='arbitrage-plot'),
-        ]),
-    ])
-
-    @app.callback(
-        [Output('ticker1-plot', 'figure'),
-         Output('arbitrage-plot', 'figure')],
-        [Input('interval-component', 'n_intervals')]
-    )
-    def update_plots(n):
-        df1 = data_handler.query_influxdb(ticker1, start_time="-1h")
-        df2 = data_handler.query_influxdb(ticker2, start_time="-1h")
-        
-        if df1 is None or df2 is None:
-            logger.error("Failed to retrieve data for plotting.")
-            return go.Figure(), go.Figure()
-
-        momentum = MomentumStrategy(window=10)
-        mean_reversion = MeanReversionStrategy(window=20)
-        arbitrage = ArbitrageStrategy(ticker1, ticker2, threshold=0.005)
-        
-        df_momentum = momentum.generate_signals(df1.copy())
-        df_mean_reversion = mean_reversion.generate_signals(df1.copy())
-        df_arbitrage = arbitrage.generate_signals(df1, df2)
-
-        fig1 = make_subplots(rows=2, cols=1, shared_xaxes=True, 
-                            subplot_titles=("Momentum Signals", "Mean-Reversion Signals"))
-        fig1.add_trace(go.Scatter(x=df_momentum['time'], y=df_momentum['close'], mode='lines', name='Close'), row=1, col=1)
-        fig1.add_trace(go.Scatter(x=df_momentum['time'], y=df_momentum['signal'] * df_momentum['close'].max(), 
-                                mode='markers', name='Momentum Signal', marker=dict(color='red')), row=1, col=1)
-        fig1.add_trace(go.Scatter(x=df_mean_reversion['time'], y=df_mean_reversion['close'], mode='lines', name='Close'), row=2, col=1)
-        fig1.add_trace(go.Scatter(x=df_mean_reversion['time'], y=df_mean_reversion['signal'] * df_mean_reversion['close'].max(), 
-                                mode='markers', name='Mean-Reversion Signal', marker=dict(color='green')), row=2, col=1)
-        fig1.update_layout(height=600, title_text=f"{ticker1} Multi-Strategy Comparison")
-
-        fig2 = go.Figure()
-        fig2.add_trace(go.Scatter(x=df_arbitrage['time'], y=df_arbitrage['spread'], mode='lines', name='Spread'))
-        fig2.add_trace(go.Scatter(x=df_arbitrage['time'], y=df_arbitrage['signal'] * df_arbitrage['spread'].max(), 
-                                mode='markers', name='Arbitrage Signal', marker=dict(color='purple')))
-        fig2.update_layout(title=f"Arbitrage Spread: {ticker1} vs {ticker2}", yaxis_title="Spread")
-
-        return fig1, fig2
-
-    # Run Dash server
-    app.run_server(debug=True, host='0.0.0.0', port=8050)
-    
-    data_handler.close()
+    try:
+        return args.run(args, data_handler, logger)
+    finally:
+        data_handler.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -1,6 +1,9 @@
 
+from typing import Dict, Optional
+import numpy as np
 import pandas as pd
-from utils.logger import setup_logger
+from utils.logger import RateLimitedLogger, setup_logger
+from utils.metrics import SIGNAL_SECONDS, timed
 
 class ArbitrageStrategy:
     def __init__(self, ticker1: str, ticker2: str, threshold: float = 0.02):
@@ -8,7 +11,9 @@ class ArbitrageStrategy:
         self.ticker2 = ticker2
         self.threshold = threshold
         self.logger = setup_logger(__name__)
+        self.hot_logger = RateLimitedLogger(self.logger)
 
+    @timed(SIGNAL_SECONDS, strategy="arbitrage")
     def generate_signals(self, df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
         # Merge dataframes on time
         df = pd.merge(df1[['time', 'close']], df2[['time', 'close']], 
@@ -22,6 +27,62 @@ class ArbitrageStrategy:
         df.loc[df['spread'] > self.threshold, 'signal'] = 1   # Buy ticker1, sell ticker2
         df.loc[df['spread'] < -self.threshold, 'signal'] = -1 # Sell ticker1, buy ticker2
         
-        self.logger.info(f"Generated arbitrage signals for {self.ticker1} vs {self.ticker2} "
-                        f"with threshold={self.threshold}")
-        return df
\ No newline at end of file
+        self.hot_logger.info("Generated arbitrage signals for %s vs %s with threshold=%s",
+                             self.ticker1, self.ticker2, self.threshold)
+        return df
+
+    def signal(self, close1: float, close2: float) -> int:
+        # Signal for one aligned pair of closes, with the same spread and thresholds as generate_signals
+        spread = (close1 - close2) / close2
+        return 1 if spread > self.threshold else -1 if spread < -self.threshold else 0
+
+    @staticmethod
+    def build_panel(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+
+        # Align the close prices of many tickers into one time x ticker matrix in a single pass.
+        # Timestamps missing for a ticker stay NaN, so pairs involving it get no signal there.
+
+        closes = {ticker: df.set_index("time")["close"] for ticker, df in frames.items()}
+        return pd.DataFrame(closes).sort_index()
+
+    @timed(SIGNAL_SECONDS, strategy="scan_pairs")
+    def scan_pairs(self, panel: pd.DataFrame, top_n: int = 20, zscore_window: Optional[int] = None,
+                   corr_window: Optional[int] = None) -> pd.DataFrame:
+
+        # Spread and threshold signal for all N*(N-1)/2 pairs at the latest timestamp, computed
+        # with broadcasting over the panel instead of one merge per pair. The spread of a pair
+        # is normalized by its second ticker, as in generate_signals. Pairs are ranked by
+        # |z-score| of the spread when zscore_window is given, otherwise by |spread|.
+
+        tickers = panel.columns.to_numpy()
+        lookback = max(zscore_window or 1, (corr_window or 0) + 1)
+        prices = panel.to_numpy(dtype="float64")[-lookback:]
+        first, second = np.triu_indices(len(tickers), k=1)
+        spreads = (prices[:, first] - prices[:, second]) / prices[:, second]
+        latest = spreads[-1]
+        result = {
+            "ticker1": tickers[first],
+            "ticker2": tickers[second],
+            "spread": latest,
+            "signal": np.where(latest > self.threshold, 1, np.where(latest < -self.threshold, -1, 0)),
+        }
+        score = np.abs(latest)
+        if zscore_window:
+            window = spreads[-zscore_window:]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                zscore = (latest - window.mean(axis=0)) / window.std(axis=0, ddof=1)
+            result["zscore"] = zscore
+            score = np.abs(zscore)
+        if corr_window:
+            returns = prices[-corr_window - 1:]
+            returns = returns[1:] / returns[:-1] - 1
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result["correlation"] = np.corrcoef(returns, rowvar=False)[first, second]
+
+        score = np.nan_to_num(score, nan=-np.inf)
+        top_n = min(top_n, len(score))
+        top = np.argpartition(-score, top_n - 1)[:top_n] if top_n else np.empty(0, dtype=int)
+        top = top[np.argsort(-score[top], kind="stable")]
+        self.hot_logger.info("Scanned %d pairs across %d tickers with threshold=%s",
+                             len(score), len(tickers), self.threshold)
+        return pd.DataFrame({name: values[top] for name, values in result.items()})
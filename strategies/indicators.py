@@ -0,0 +1,121 @@
+
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from utils.logger import RateLimitedLogger, setup_logger
+from utils.metrics import SIGNAL_SECONDS, timed
+
+# An indicator is identified by its registered name plus parameters, e.g. ("sma", 20) or
+# ("upper_band", 20, 2.0); two strategies asking for the same key share one computation.
+IndicatorKey = Tuple
+
+INDICATORS: Dict[str, Callable[..., np.ndarray]] = {}
+
+
+def indicator(name: str):
+    # Register fn(indicators, *params) -> array aligned with the close prices. Dependencies are
+    # requested through indicators.get(), so the registry forms a DAG evaluated on demand.
+    def register(fn: Callable[..., np.ndarray]):
+        INDICATORS[name] = fn
+        return fn
+    return register
+
+
+def column_name(key: IndicatorKey) -> str:
+    return "_".join(str(part) for part in key)
+
+
+class IndicatorSet:
+    # Memoized indicator values over one close series: each key is computed once, after its
+    # dependencies, however many strategies declare it.
+    def __init__(self, close: np.ndarray):
+        self.close = np.asarray(close, dtype="float64")
+        self.values: Dict[IndicatorKey, np.ndarray] = {}
+        self._series = None
+
+    @property
+    def series(self) -> pd.Series:
+        # For the rolling indicators, so their values match the pandas generate_signals exactly
+        if self._series is None:
+            self._series = pd.Series(self.close, copy=False)
+        return self._series
+
+    def get(self, key: IndicatorKey) -> np.ndarray:
+        if key not in self.values:
+            name, *params = key
+            if name not in INDICATORS:
+                raise KeyError(f"Unknown indicator: {name}")
+            self.values[key] = INDICATORS[name](self, *params)
+        return self.values[key]
+
+
+@indicator("momentum")
+def _momentum(ind: IndicatorSet, window: int) -> np.ndarray:
+    # close.pct_change(periods=window)
+    out = np.full(len(ind.close), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[window:] = ind.close[window:] / ind.close[:-window] - 1
+    return out
+
+
+@indicator("sma")
+def _sma(ind: IndicatorSet, window: int) -> np.ndarray:
+    return ind.series.rolling(window=window).mean().to_numpy()
+
+
+@indicator("std")
+def _std(ind: IndicatorSet, window: int) -> np.ndarray:
+    return ind.series.rolling(window=window).std().to_numpy()
+
+
+@indicator("upper_band")
+def _upper_band(ind: IndicatorSet, window: int, std_dev: float) -> np.ndarray:
+    return ind.get(("sma", window)) + (std_dev * ind.get(("std", window)))
+
+
+@indicator("lower_band")
+def _lower_band(ind: IndicatorSet, window: int, std_dev: float) -> np.ndarray:
+    return ind.get(("sma", window)) - (std_dev * ind.get(("std", window)))
+
+
+class StrategySet:
+    # Evaluates many single-series strategies over the same bars in one pass. Each strategy
+    # declares its indicators (strategy.indicators(): column -> key) and turns them into signals
+    # with strategy.fill_signals(close, values, out); shared keys are computed once and all
+    # signals are written into one preallocated (strategies x bars) int8 matrix.
+    def __init__(self, strategies: Dict[str, object]):
+        self.strategies = strategies
+        self.logger = setup_logger(__name__)
+        self.hot_logger = RateLimitedLogger(self.logger)
+        self._signals = np.empty((len(strategies), 0), dtype=np.int8)
+
+    def plan(self) -> List[IndicatorKey]:
+        # Unique indicator keys in first-declared order
+        keys = {}
+        for strategy in self.strategies.values():
+            keys.update(dict.fromkeys(strategy.indicators().values()))
+        return list(keys)
+
+    @timed(SIGNAL_SECONDS, strategy="strategy_set")
+    def evaluate(self, close: np.ndarray) -> Tuple[np.ndarray, IndicatorSet]:
+        # The returned signal matrix is reused by the next call with the same number of bars
+        indicators = IndicatorSet(close)
+        for key in self.plan():
+            indicators.get(key)
+        n = len(indicators.close)
+        if self._signals.shape[1] != n:
+            self._signals = np.empty((len(self.strategies), n), dtype=np.int8)
+        for row, strategy in zip(self._signals, self.strategies.values()):
+            values = {column: indicators.get(key) for column, key in strategy.indicators().items()}
+            strategy.fill_signals(indicators.close, values, row)
+        self.hot_logger.info("Evaluated %d strategies on %d bars with %d indicators",
+                             len(self.strategies), n, len(indicators.values))
+        return self._signals, indicators
+
+    def frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        # One copy of df with a column per computed indicator ("sma_20", "upper_band_20_2.0", ...)
+        # and one signal column per strategy name
+        signals, indicators = self.evaluate(df["close"].to_numpy(dtype="float64"))
+        columns = {column_name(key): values for key, values in indicators.values.items()}
+        columns.update({name: row.astype(np.int64) for name, row in zip(self.strategies, signals)})
+        return pd.concat([df.reset_index(drop=True), pd.DataFrame(columns)], axis=1)
@@ -1,13 +1,25 @@
 
+import math
+import numpy as np
 import pandas as pd
-from utils.logger import setup_logger
+from strategies.streaming import RollingWindow, bar_close
+from utils.logger import RateLimitedLogger, setup_logger
+from utils.metrics import SIGNAL_SECONDS, timed
 
 class MeanReversionStrategy:
     def __init__(self, window: int = 20, std_dev: float = 2.0):
         self.window = window
         self.std_dev = std_dev
         self.logger = setup_logger(__name__)
+        self.hot_logger = RateLimitedLogger(self.logger)
+        self.reset()
 
+    def reset(self):
+        # Clear the streaming state used by update()
+        self._closes = RollingWindow(self.window)
+        self.sma = self.std = self.upper_band = self.lower_band = math.nan
+
+    @timed(SIGNAL_SECONDS, strategy="mean_reversion")
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
 
         # Generate buy/sell signals based on Bollinger Bands.
@@ -20,5 +32,39 @@ class MeanReversionStrategy:
         df["signal"] = 0
         df.loc[df["close"] < df["lower_band"], "signal"] = 1  
         df.loc[df["close"] > df["upper_band"], "signal"] = -1  
-        self.logger.info(f"Generated mean-reversion signals with window={self.window}")
-        return df
\ No newline at end of file
+        self.hot_logger.info("Generated mean-reversion signals with window=%s", self.window)
+        return df
+
+    def indicators(self) -> dict:
+        # Indicators for StrategySet, keyed by the column name generate_signals uses
+        return {
+            "sma": ("sma", self.window),
+            "std": ("std", self.window),
+            "upper_band": ("upper_band", self.window, self.std_dev),
+            "lower_band": ("lower_band", self.window, self.std_dev),
+        }
+
+    def fill_signals(self, close: np.ndarray, values: dict, out: np.ndarray):
+        # Array form of the signal rule in generate_signals, written into out
+        out.fill(0)
+        out[close < values["lower_band"]] = 1
+        out[close > values["upper_band"]] = -1
+
+    def update(self, bar) -> int:
+
+        # Streaming counterpart of generate_signals: running mean/variance over a ring buffer,
+        # so each bar costs O(1) regardless of the window size.
+
+        close = bar_close(bar)
+        self._closes.push(close)
+        if not self._closes.full:
+            return 0
+        self.sma = self._closes.mean
+        self.std = self._closes.std()
+        self.upper_band = self.sma + (self.std_dev * self.std)
+        self.lower_band = self.sma - (self.std_dev * self.std)
+        if close < self.lower_band:
+            return 1
+        if close > self.upper_band:
+            return -1
+        return 0
@@ -1,12 +1,24 @@
 
+import math
+import numpy as np
 import pandas as pd
-from utils.logger import setup_logger
+from strategies.streaming import RollingWindow, bar_close
+from utils.logger import RateLimitedLogger, setup_logger
+from utils.metrics import SIGNAL_SECONDS, timed
 
 class MomentumStrategy:
     def __init__(self, window: int = 10):
         self.window = window
         self.logger = setup_logger(__name__)
+        self.hot_logger = RateLimitedLogger(self.logger)
+        self.reset()
 
+    def reset(self):
+        # Clear the streaming state used by update()
+        self._closes = RollingWindow(self.window)
+        self.momentum = math.nan
+
+    @timed(SIGNAL_SECONDS, strategy="momentum")
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
 
         # Generate buy/sell signals based on momentum.
@@ -15,5 +27,33 @@ class MomentumStrategy:
         df["signal"] = 0
         df.loc[df["momentum"] > 0, "signal"] = 1  
         df.loc[df["momentum"] < 0, "signal"] = -1  
-        self.logger.info(f"Generated momentum signals with window={self.window}")
-        return df
\ No newline at end of file
+        self.hot_logger.info("Generated momentum signals with window=%s", self.window)
+        return df
+
+    def indicators(self) -> dict:
+        # Indicators for StrategySet, keyed by the column name generate_signals uses
+        return {"momentum": ("momentum", self.window)}
+
+    def fill_signals(self, close: np.ndarray, values: dict, out: np.ndarray):
+        # Array form of the signal rule in generate_signals, written into out
+        out.fill(0)
+        out[values["momentum"] > 0] = 1
+        out[values["momentum"] < 0] = -1
+
+    def update(self, bar) -> int:
+
+        # Streaming counterpart of generate_signals: consumes one bar and returns its signal in O(1).
+
+        close = bar_close(bar)
+        if self._closes.full:
+            past = self._closes.oldest()
+            if past != 0:
+                self.momentum = close / past - 1
+            else:
+                self.momentum = math.copysign(math.inf, close) if close else math.nan
+        self._closes.push(close)
+        if self.momentum > 0:
+            return 1
+        if self.momentum < 0:
+            return -1
+        return 0
@@ -0,0 +1,62 @@
+
+import math
+
+
+def bar_close(bar) -> float:
+    # Accepts Alpaca Bar objects, dicts and DataFrame rows (lower- or upper-case column names)
+    if hasattr(bar, "close"):
+        return float(bar.close)
+    return float(bar["close"] if "close" in bar else bar["Close"])
+
+
+class RollingWindow:
+    # Fixed-size ring buffer with running mean and sum of squared deviations (Welford),
+    # so the window mean/std are available in O(1) per value. The running sums are rebuilt
+    # from the buffer once per full revolution to keep floating-point drift bounded.
+    def __init__(self, size: int):
+        self.size = size
+        self.values = [0.0] * size
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.size
+
+    def oldest(self) -> float:
+        # Value that the next push will evict
+        return self.values[self.count % self.size]
+
+    def push(self, value: float):
+        idx = self.count % self.size
+        if self.count < self.size:
+            n = self.count + 1
+            delta = value - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (value - self.mean)
+        elif idx == 0:
+            self.values[idx] = value
+            self.count += 1
+            self._rebuild()
+            return
+        else:
+            old = self.values[idx]
+            old_mean = self.mean
+            self.mean += (value - old) / self.size
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+        self.values[idx] = value
+        self.count += 1
+
+    def std(self) -> float:
+        n = len(self)
+        if n < 2:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (n - 1))
+
+    def _rebuild(self):
+        self.mean = math.fsum(self.values) / self.size
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
@@ -0,0 +1,178 @@
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import pytest
+from backtest.engine import ArbitrageBTStrategy, BacktestEngine, MeanReversionBTStrategy, MomentumBTStrategy
+from backtest.feeds import NumpyData
+from backtest.sweep import ParameterSweep
+from backtest.vectorized import VectorizedBacktester
+from strategies.arbitrage import ArbitrageStrategy
+from strategies.momentum import MomentumStrategy
+
+
+def make_bars(periods=300, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.2, periods))
+    return pd.DataFrame({
+        "time": pd.date_range("2023-01-02 14:30", periods=periods, freq="1min", tz="UTC"),
+        "open": close, "high": close + 0.1, "low": close - 0.1, "close": close, "volume": 100.0,
+    })
+
+
+def test_parameter_sweep_resumes_from_checkpoint(tmp_path):
+    checkpoint = tmp_path / "sweep.jsonl"
+    datasets = {"AAPL": make_bars(seed=1), "SPY": make_bars(seed=2)}
+    sweep = ParameterSweep(MomentumBTStrategy, {"window": [5, 10]}, processes=2, checkpoint_path=str(checkpoint))
+    results = sweep.run(datasets)
+    assert list(results[["ticker", "window"]].itertuples(index=False, name=None)) == [
+        ("AAPL", 5), ("AAPL", 10), ("SPY", 5), ("SPY", 10)]
+    assert {"final_value", "sharpe", "max_drawdown", "trades"} <= set(results.columns)
+
+    # drop one finished run, as if the sweep crashed before writing it
+    lines = checkpoint.read_text().splitlines()
+    checkpoint.write_text("\n".join(lines[:-1]) + "\n")
+    resumed = sweep.run(datasets)
+    pd.testing.assert_frame_equal(resumed, results)
+    assert len(checkpoint.read_text().splitlines()) == 4
+
+
+def test_parameter_sweep_with_only_failed_runs_is_empty():
+    # the arbitrage strategy needs two feeds, so every single-feed run fails
+    sweep = ParameterSweep(ArbitrageBTStrategy, {"threshold": [0.01, 0.02]}, processes=1)
+    results = sweep.run({"AAPL": make_bars(seed=1)})
+    assert results.empty
+    assert list(results.columns) == ["ticker", "threshold", "final_value", "sharpe", "max_drawdown", "trades"]
+
+
+def test_vectorized_backtester_matches_backtrader_momentum():
+    df = make_bars(periods=400, seed=5)
+    df["open"] = df["close"].shift(1).fillna(df["close"].iloc[0]) + 0.05
+    cash = 100000.0
+
+    data = bt.feeds.PandasData(dataname=df.set_index("time")[["open", "high", "low", "close", "volume"]])
+    engine = BacktestEngine(cash=cash, commission=0.001)
+    cerebro = engine.run_backtest(data, MomentumBTStrategy, window=10)
+
+    signals = MomentumStrategy(window=10).generate_signals(df.copy())
+    result = VectorizedBacktester(cash=cash, commission=0.001).run(signals, mode="orders")
+    assert result.stats["final_value"] == pytest.approx(cerebro.broker.getvalue(), rel=1e-9)
+    assert result.equity["position"].iloc[-1] == cerebro.runstrats[0][0].position.size
+
+
+def test_vectorized_backtester_target_positions():
+    df = pd.DataFrame({
+        "time": pd.date_range("2023-01-02", periods=5, freq="1min"),
+        "open": [10.0, 11.0, 12.0, 13.0, 14.0],
+        "close": [10.5, 11.5, 12.5, 13.5, 14.5],
+        "signal": [1, 1, -1, 0, 0],
+    })
+    result = VectorizedBacktester(cash=100.0, commission=0.0).run(df, size=2)
+    assert result.trades["size"].tolist() == [2.0, -4.0, 2.0]
+    assert result.trades["price"].tolist() == [11.0, 13.0, 14.0]
+    assert result.equity["position"].tolist() == [0, 2, 2, -2, 0]
+    assert result.stats["final_value"] == pytest.approx(100 + 2 * (13 - 11) - 2 * (14 - 13))
+
+
+def test_walk_forward_matches_per_window_vectorized_runs():
+    from backtest.walk_forward import WalkForward, walk_forward_windows
+    from strategies.mean_reversion import MeanReversionStrategy
+    df = make_bars(periods=600, seed=9)
+    candidates = {f"momentum_{w}": MomentumStrategy(window=w) for w in (5, 20)}
+    candidates["bands"] = MeanReversionStrategy(window=20)
+    assert walk_forward_windows(600, 200, 100, step=50)[:2] == [(0, 200, 300), (50, 250, 350)]
+
+    serial = WalkForward(candidates, cash=1e5, processes=1).run(df, train_bars=200, test_bars=100, step=50)
+    parallel = WalkForward(candidates, cash=1e5, processes=2).run(df, train_bars=200, test_bars=100, step=50)
+    pd.testing.assert_frame_equal(serial.windows, parallel.windows)
+    assert serial.summary["windows"] == len(serial.windows) == 7
+
+    # each test window equals a vectorized run of the chosen strategy's full-history signals
+    frames = {name: s.generate_signals(df.copy()) for name, s in candidates.items()}
+    engine = VectorizedBacktester(cash=1e5, commission=0.001)
+    for (_, lo, hi), row in zip(walk_forward_windows(600, 200, 100, step=50), serial.windows.itertuples()):
+        expected = engine.run(frames[row.strategy].iloc[lo:hi]).stats
+        assert row.test_final_value == pytest.approx(expected["final_value"])
+        assert row.test_fills == expected["fills"]
+    # step=50 < test_bars=100: windows overlap, so their returns are not compounded
+    assert "compounded_return" not in serial.summary
+    assert serial.summary["mean_return"] == pytest.approx(serial.windows["test_total_return"].mean())
+
+    tiled = WalkForward(candidates, cash=1e5, processes=1).run(df, train_bars=200, test_bars=100)
+    returns = tiled.windows["test_total_return"]
+    assert len(returns) == 4
+    assert tiled.summary["compounded_return"] == pytest.approx(np.prod(1 + returns) - 1)
+
+
+def test_numpy_feed_matches_pandas_feed():
+    df = make_bars(periods=400, seed=3)
+    df["open"] = df["close"].shift(1).fillna(df["close"].iloc[0]) + 0.05
+    engine = BacktestEngine(cash=100000.0, commission=0.001)
+    pandas_feed = bt.feeds.PandasData(dataname=df.set_index("time")[["open", "high", "low", "close", "volume"]])
+    expected = engine.run_backtest(pandas_feed, MomentumBTStrategy, window=10)
+
+    for preload, runonce in [(True, True), (False, False)]:
+        cerebro = engine.run_backtest(NumpyData.from_frame(df), MomentumBTStrategy, preload=preload,
+                                      runonce=runonce, window=10)
+        assert cerebro.broker.getvalue() == expected.broker.getvalue()
+        data, reference = cerebro.datas[0], expected.datas[0]
+        assert list(data.datetime.array) == list(reference.datetime.array)
+
+    # fromdate/todate trim the preloaded arrays like any backtrader feed
+    start, end = df["time"].iloc[100].to_pydatetime(), df["time"].iloc[199].to_pydatetime()
+    cerebro = engine.run_backtest(NumpyData.from_frame(df, fromdate=start, todate=end), MomentumBTStrategy)
+    assert len(cerebro.datas[0]) == 100
+    assert cerebro.datas[0].datetime.datetime(-99) == start.replace(tzinfo=None)
+
+
+def test_portfolio_backtest_matches_vectorized_mean_reversion():
+    from strategies.mean_reversion import MeanReversionStrategy
+    frames = {f"T{i}": make_bars(periods=300, seed=i) for i in range(5)}
+    for df in frames.values():
+        df["open"] = df["close"].shift(1).fillna(df["close"].iloc[0]) + 0.05
+    cash = 1e6
+    cerebro = BacktestEngine(cash=cash, commission=0.001).run_backtest(
+        NumpyData.from_frames(frames), [MeanReversionBTStrategy, (MomentumBTStrategy, {"window": 5})],
+        stdstats=False, window=20)
+    assert len(cerebro.runstrats[0]) == 2
+
+    # every feed shares one broker; the mean-reversion legs alone match the vectorized engine
+    only_bands = BacktestEngine(cash=cash, commission=0.001).run_backtest(
+        NumpyData.from_frames(frames), MeanReversionBTStrategy, window=20)
+    engine = VectorizedBacktester(cash=cash, commission=0.001)
+    pnl = 0.0
+    for ticker, df in frames.items():
+        result = engine.run(MeanReversionStrategy(window=20).generate_signals(df.copy()))
+        assert result.equity["position"].iloc[-1] == only_bands.broker.getposition(
+            only_bands.datasbyname[ticker]).size
+        pnl += result.stats["final_value"] - cash
+    assert only_bands.broker.getvalue() == pytest.approx(cash + pnl, rel=1e-9)
+
+
+def test_arbitrage_strategy_trades_both_legs():
+    a = make_bars(periods=200, seed=4)
+    b = a.copy()
+    b["close"] = a["close"] * np.where(np.arange(200) % 40 < 20, 1.05, 0.95)
+    b["open"] = b["high"] = b["low"] = b["close"]
+    cerebro = BacktestEngine(cash=1e5, commission=0.0).run_backtest(
+        {"A": NumpyData.from_frame(a), "B": NumpyData.from_frame(b)}, ArbitrageBTStrategy,
+        pairs=[("A", "B")], size=3)
+    legs = [cerebro.broker.getposition(d).size for d in cerebro.datas]
+    # the spread (A - B) / B is about +5.3% on the last bar, so A is held long and B short
+    assert legs == [3, -3]
+    trades = ArbitrageStrategy("A", "B").generate_signals(a, b)
+    assert trades["signal"].iloc[-1] == 1
+
+
+def test_shared_params_only_reach_strategies_that_declare_them():
+    feeds = [NumpyData.from_frame(make_bars(periods=100, seed=s)) for s in (1, 2)]
+    cerebro = BacktestEngine().run_backtest(feeds, [MomentumBTStrategy, ArbitrageBTStrategy],
+                                            threshold=0.01, window=5)
+    momentum, arbitrage = cerebro.runstrats[0]
+    assert (momentum.params.window, arbitrage.params.threshold) == (5, 0.01)
+    # a shared param that no strategy declares, e.g. a typo in a sweep grid, is not silently dropped
+    with pytest.raises(TypeError, match="windw"):
+        BacktestEngine().run_backtest(feeds, MomentumBTStrategy, windw=5)
+    # params given with a class are not filtered, so a misspelt one still fails
+    with pytest.raises(TypeError):
+        BacktestEngine().run_backtest(feeds, [(ArbitrageBTStrategy, {"treshold": 0.01})])
@@ -0,0 +1,62 @@
+import json
+import numpy as np
+from benchmarks.influx_standin import InfluxStandIn
+from benchmarks.run import compare
+from benchmarks.synthetic import make_ohlcv
+from utils.data_handler import DataHandler
+
+
+def test_compare_flags_throughput_regressions():
+    baseline = {"a": {"throughput": 1000.0}, "b": {"throughput": 1000.0}}
+    results = {"a": {"throughput": 800.0}, "b": {"throughput": 700.0}, "new": {"throughput": 1.0}}
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("b:")
+
+
+def test_standin_roundtrip():
+    df = make_ohlcv(50, capitalized=True)
+    with InfluxStandIn() as standin:
+        handler = DataHandler(url=standin.url, token="test")
+        stats = handler.write_bulk_to_influxdb({"AAPL": df}, batch_size=20, invalidate_cache=False)
+        assert stats["rows"] == 50 and standin.lines == 50 and standin.writes == 3
+
+        standin.frames["AAPL"] = make_ohlcv(50)
+        result = handler.query_influxdb("AAPL", start_time="-3650d")
+        handler.close()
+    assert len(result) == 50
+    assert np.allclose(result["close"].to_numpy(), standin.frames["AAPL"]["close"].to_numpy())
+
+
+def test_missing_baseline_fails_unless_allowed(tmp_path):
+    from benchmarks.run import main
+    args = ["--only", "momentum.generate_signals", "--repeat", "1", "--output", str(tmp_path / "results.json"),
+            "--baseline", str(tmp_path / "missing.json")]
+    assert main(args) == 2
+    assert main(args + ["--allow-missing-baseline"]) == 0
+    assert main(args + ["--save-baseline"]) == 0
+    assert main(args + ["--tolerance", "0.9"]) == 0
+
+
+def test_compare_uses_best_throughput():
+    baseline = {"a": {"throughput": 900.0, "best_throughput": 1000.0}}
+    # a noisy median alone is not a regression; the fastest repetition is what is compared
+    assert compare({"a": {"throughput": 500.0, "best_throughput": 950.0}}, baseline, tolerance=0.25) == []
+    assert len(compare({"a": {"throughput": 500.0, "best_throughput": 700.0}}, baseline, tolerance=0.25)) == 1
+    # baselines saved before best_throughput existed fall back to the median
+    assert compare({"a": {"throughput": 800.0, "best_throughput": 950.0}}, {"a": {"throughput": 900.0}}, 0.25) == []
+
+
+def test_default_tolerance_covers_measured_run_to_run_noise(tmp_path, capsys):
+    from benchmarks.run import DEFAULT_TOLERANCE, main
+    # identical code measured 30-40% slower between runs on a shared runner
+    assert compare({"a": {"throughput": 1.0, "best_throughput": 600.0}},
+                   {"a": {"throughput": 1.0, "best_throughput": 1000.0}}, DEFAULT_TOLERANCE) == []
+    baseline = tmp_path / "baseline.json"
+    args = ["--only", "momentum.generate_signals", "--repeat", "1", "--output", str(tmp_path / "out.json"),
+            "--baseline", str(baseline)]
+    assert main(args + ["--save-baseline"]) == 0
+    saved = json.loads(baseline.read_text())
+    saved["meta"]["platform"] = "some-other-runner"
+    baseline.write_text(json.dumps(saved))
+    main(args)
+    assert "different setup (platform some-other-runner vs" in capsys.readouterr().err
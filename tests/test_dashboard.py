@@ -0,0 +1,77 @@
+
+import numpy as np
+import pandas as pd
+from apps.dashboard import SignalCache, downsample, visible_range
+from utils.downsample import lttb
+
+
+class FakeHandler:
+    def __init__(self, frames):
+        self.frames = frames
+
+    def query_cached(self, ticker, start_time="-1d"):
+        return self.frames[ticker]
+
+
+def make_frame(periods, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.2, periods))
+    return pd.DataFrame({"time": pd.date_range("2023-01-02", periods=periods, freq="1min", tz="UTC"),
+                         "close": close, "open": close, "high": close, "low": close, "volume": 1.0})
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 5.0
+    picked = lttb(x, y, 500)
+    assert len(picked) == 500 and picked[0] == 0 and picked[-1] == 9999
+    assert np.all(np.diff(picked) > 0) and 4321 in picked
+
+
+def test_downsample_to_zoomed_range():
+    df = make_frame(20000)
+    assert len(downsample(df, "close", None, 2000)) == 2000
+    zoom = visible_range({"xaxis.range[0]": "2023-01-02 01:00:00", "xaxis.range[1]": "2023-01-02 02:00:00"})
+    view = downsample(df, "close", zoom, 2000)
+    assert len(view) == 61 and view["time"].iloc[0] == pd.Timestamp("2023-01-02 01:00", tz="UTC")
+    assert visible_range({"autosize": True}) is None
+
+
+def test_signal_cache_recomputes_only_on_new_bars():
+    handler = FakeHandler({"AAPL": make_frame(100), "SPY": make_frame(100, seed=1)})
+    cache = SignalCache(handler, "AAPL", "SPY", "-5d")
+    first = cache.get()
+    assert cache.get() is first
+    handler.frames["AAPL"] = make_frame(101)
+    second = cache.get()
+    assert second is not first and len(second[0]) == 101
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    from apps.dashboard import create_app
+    from utils.metrics import SIGNAL_SECONDS
+    SIGNAL_SECONDS.observe(0.01, strategy="momentum")
+    app = create_app(FakeHandler({"AAPL": make_frame(10), "SPY": make_frame(10, seed=1)}))
+    response = app.server.test_client().get("/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    assert 'signal_seconds_count{strategy="momentum"}' in response.get_data(as_text=True)
+
+
+def test_callbacks_handle_pair_without_overlapping_bars():
+    from apps.dashboard import create_app
+    spy = make_frame(10, seed=1)
+    spy["time"] += pd.Timedelta("1h")  # no timestamp in common with AAPL, so the arbitrage merge is empty
+    handler = FakeHandler({"AAPL": make_frame(10), "SPY": spy})
+    app = create_app(handler)
+    update, extend = [entry["callback"].__wrapped__ for entry in app.callback_map.values()]
+
+    _, _, sent = update(None, None)
+    assert sent["arbitrage"] is None and sent["ticker1"] == make_frame(10)["time"].iloc[-1].isoformat()
+
+    # once the bars line up, the whole arbitrage frame is appended
+    spy = make_frame(12, seed=1)
+    handler.frames.update({"AAPL": make_frame(12), "SPY": spy})
+    extend1, extend2, cursor = extend(1, sent)
+    assert len(extend1[0]["x"][0]) == 2 and len(extend2[0]["x"][0]) == 12
+    assert cursor["arbitrage"] == spy["time"].iloc[-1].isoformat()
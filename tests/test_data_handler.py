@@ -0,0 +1,272 @@
+
+import numpy as np
+import pandas as pd
+from influxdb_client import Point
+from utils.data_handler import DataHandler, to_line_protocol
+from utils.query_cache import QueryCache
+from utils.bar_store import BarStore
+
+
+def make_ohlcv(periods=10, start="2023-01-02 14:30"):
+    close = [100.0 + i * 0.25 for i in range(periods)]
+    return pd.DataFrame({
+        "time": pd.date_range(start, periods=periods, freq="1min", tz="UTC"),
+        "Open": close,
+        "High": [c + 1 for c in close],
+        "Low": [c - 1 for c in close],
+        "Close": close,
+        "Volume": [1000 + i for i in range(periods)],
+    })
+
+
+class FakeWriteApi:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.payloads = []
+
+    def write(self, bucket, org, record):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("influx unavailable")
+        self.payloads.append(record)
+
+
+def test_line_protocol_matches_point():
+    df = make_ohlcv()
+    expected = [
+        Point("stock_data")
+        .tag("ticker", "AAPL")
+        .field("open", float(row["Open"]))
+        .field("high", float(row["High"]))
+        .field("low", float(row["Low"]))
+        .field("close", float(row["Close"]))
+        .field("volume", int(row["Volume"]))
+        .time(row["time"])
+        .to_line_protocol()
+        for _, row in df.iterrows()
+    ]
+    assert to_line_protocol(df, "AAPL").tolist() == expected
+
+
+def test_bulk_write_batches_and_retries():
+    handler = DataHandler()
+    handler.write_api = FakeWriteApi(failures=1)
+    frames = {"AAPL": make_ohlcv(25), "SPY": make_ohlcv(7)}
+    stats = handler.write_bulk_to_influxdb(frames, batch_size=10, retry_interval=0)
+    lines = [line for payload in handler.write_api.payloads for line in payload.split("\n")]
+    assert stats["rows"] == 32 and stats["batches"] == 4
+    assert len(lines) == 32
+    assert stats["bytes"] == sum(len(p) for p in handler.write_api.payloads)
+    handler.close()
+
+
+class FakeInflux:
+    # Answers query_influxdb from an in-memory frame and records the requested start times
+    def __init__(self, df):
+        self.df = df
+        self.starts = []
+
+    def query_influxdb(self, ticker, start_time="-1d"):
+        self.starts.append(start_time)
+        result = self.df[self.df["time"] >= pd.Timestamp(start_time)]
+        return result.reset_index(drop=True) if not result.empty else None
+
+
+def make_query_frame(periods, end=None):
+    end = end or pd.Timestamp.now(tz="UTC").floor("1min")
+    times = pd.date_range(end=end, periods=periods, freq="1min")
+    close = [100.0 + i for i in range(periods)]
+    return pd.DataFrame({"time": times, "close": close, "open": close, "high": close, "low": close,
+                         "volume": [10] * periods})
+
+
+def test_client_is_created_once_across_threads(monkeypatch):
+    import threading
+    import time
+    created = []
+
+    class SlowClient:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)
+            created.append(self)
+            self.closed = False
+
+        def query_api(self):
+            return object()
+
+        def write_api(self, write_options=None):
+            return object()
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr("influxdb_client.InfluxDBClient", SlowClient)
+    handler = DataHandler()
+    start = threading.Barrier(8)
+
+    def touch(i):
+        start.wait()
+        return handler.query_api if i % 2 else handler.write_api
+
+    threads = [threading.Thread(target=touch, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    handler.close()
+    assert len(created) == 1 and created[0].closed
+
+
+def test_query_cache_serves_overlapping_windows_and_fetches_tail():
+    source = FakeInflux(make_query_frame(600))
+    cache = QueryCache(source, ttl=0)
+    hour = cache.get("AAPL", "-1h")
+    assert cache.stats()["misses"] == 1
+    five = cache.get("AAPL", "-5m")
+    assert len(five) <= 6 and five["time"].iloc[-1] == hour["time"].iloc[-1]
+    assert cache.stats()["tail_fetches"] == 1
+
+    new_bar = make_query_frame(1, end=source.df["time"].iloc[-1] + pd.Timedelta("1min"))
+    source.df = pd.concat([source.df, new_bar], ignore_index=True)
+    latest = cache.get("AAPL", "-1h")
+    assert latest["time"].iloc[-1] == new_bar["time"].iloc[0]
+    assert latest["time"].is_unique
+    # the tail query starts at the last cached bar, not at the window start
+    assert pd.Timestamp(source.starts[-1]) == hour["time"].iloc[-1]
+
+    cache.ttl = 60
+    cache.get("AAPL", "-30m")
+    assert cache.stats()["hits"] == 1 and cache.stats()["round_trips"] == 3
+
+
+def test_query_cache_evicts_least_recently_used():
+    source = FakeInflux(make_query_frame(60))
+    cache = QueryCache(source, ttl=60)
+    cache.get("AAPL", "-1h")
+    cache.max_bytes = cache.stats()["bytes"] + 1
+    cache.get("SPY", "-1h")
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["tickers"] == 1
+    cache.get("SPY", "-1h")
+    assert cache.stats()["hits"] == 1
+
+
+def test_query_cache_trims_rows_older_than_the_widest_window(monkeypatch):
+    now = pd.Timestamp.now(tz="UTC").floor("1min")
+    monkeypatch.setattr("utils.query_cache._utcnow", lambda: now)
+    source = FakeInflux(make_query_frame(600, end=now))
+    cache = QueryCache(source, ttl=0)
+    assert len(cache.get("AAPL", "-1h")) == 61
+    assert len(cache.get("AAPL", "-30m")) == 31
+    size = cache.stats()["bytes"]
+
+    # three hours later the dashboard still asks for the last hour: the frame does not keep growing
+    now += pd.Timedelta("3h")
+    source.df = pd.concat([source.df, make_query_frame(180, end=now)], ignore_index=True)
+    window = cache.get("AAPL", "-1h")
+    assert len(window) == 61 and window["time"].iloc[-1] == now
+    assert cache.stats()["bytes"] <= size
+    # a wider window than any served before is a miss, not a silently truncated slice
+    assert len(cache.get("AAPL", "-2h")) == 121 and cache.stats()["misses"] == 2
+
+
+def test_query_cache_serves_other_tickers_during_a_slow_fetch():
+    import threading
+    release, started = threading.Event(), threading.Event()
+
+    class SlowInflux(FakeInflux):
+        def query_influxdb(self, ticker, start_time="-1d"):
+            if ticker == "SLOW":
+                started.set()
+                release.wait(5)
+            return super().query_influxdb(ticker, start_time)
+
+    cache = QueryCache(SlowInflux(make_query_frame(60)), ttl=60)
+    cache.get("AAPL", "-1h")
+    slow = threading.Thread(target=cache.get, args=("SLOW", "-1h"))
+    slow.start()
+    assert started.wait(5)
+    # answered from the cache while the SLOW round trip is still in flight
+    assert len(cache.get("AAPL", "-1h")) == 60 and cache.stats()["hits"] == 1
+    release.set()
+    slow.join()
+    assert cache.stats()["tickers"] == 2
+
+
+def test_bar_store_roundtrip_with_time_range(tmp_path):
+    store = BarStore(str(tmp_path), partition="day")
+    df = make_ohlcv(periods=3000, start="2023-01-02 00:00")
+    store.write(df, "AAPL")
+    # rewriting overlapping bars keeps the newest values
+    store.write(df.iloc[-5:].assign(Close=1.0), "AAPL")
+    assert store.partitions("AAPL") == ["2023-01-02", "2023-01-03", "2023-01-04"]
+
+    window = store.read("AAPL", start="2023-01-02 23:00", end="2023-01-03 01:00")
+    assert len(window) == 120
+    assert window["time"].iloc[0] == pd.Timestamp("2023-01-02 23:00", tz="UTC")
+    assert list(window.columns) == ["time", "close", "open", "high", "low", "volume"]
+
+    arrays = store.read_arrays("AAPL", start="2023-01-03 01:00", end="2023-01-03 02:00", columns=["close"])
+    assert isinstance(arrays["close"], np.memmap) and set(arrays) == {"time", "close"}
+
+    full = store.read("AAPL")
+    assert len(full) == 3000 and full["time"].is_monotonic_increasing
+    assert (full["close"].iloc[-5:] == 1.0).all()
+    assert store.last_timestamp("AAPL") == df["time"].iloc[-1]
+
+
+def test_fetch_many_uses_history_cache(tmp_path):
+    from utils.history import FixtureProvider, ResponseCache
+    provider = FixtureProvider({"AAPL": make_ohlcv(30), "SPY": make_ohlcv(20)})
+    handler = DataHandler(provider=provider)
+    handler.history_cache = ResponseCache(str(tmp_path), ttl=60)
+    frames = handler.fetch_many(["AAPL", "SPY", "MISSING"], period="5d")
+    assert sorted(frames) == ["AAPL", "SPY"] and provider.calls == 3
+    again = handler.fetch_many(["AAPL", "SPY"], period="5d")
+    assert provider.calls == 3
+    pd.testing.assert_frame_equal(again["AAPL"], frames["AAPL"])
+    handler.history_cache.ttl = 0
+    handler.fetch_many(["AAPL"], period="5d")
+    assert provider.calls == 4
+    handler.close()
+
+
+def test_backfill_writes_only_missing_rows():
+    handler = DataHandler()
+    handler.write_api = FakeWriteApi()
+    df = make_ohlcv(30)
+    # InfluxDB already holds rows 0-9 and 20-24
+    stored = pd.concat([df.iloc[:10], df.iloc[20:25]]).rename(columns=str.lower)
+    handler.query_influxdb = lambda ticker, start_time="-1d": stored if ticker == "AAPL" else None
+    written = handler.backfill_influxdb({"AAPL": df, "SPY": make_ohlcv(5)})
+    assert written == {"AAPL": 15, "SPY": 5}
+    lines = [line for payload in handler.write_api.payloads for line in payload.split("\n")]
+    assert len(lines) == 20
+    handler.close()
+
+
+def test_flux_query_pushes_down_projection_and_aggregation():
+    from utils.flux_query import build_flux_query
+    query = build_flux_query("bucket", ["AAPL", "SPY"], "-30d", pd.Timestamp("2023-02-01", tz="UTC"),
+                             fields=["high", "volume"], every="1h")
+    assert 'range(start: -30d, stop: 2023-02-01T00:00:00.000000Z)' in query
+    assert 'r["ticker"] == "AAPL" or r["ticker"] == "SPY"' in query
+    assert 'aggregateWindow(every: 1h, fn: max, createEmpty: false, timeSrc: "_start")' in query
+    assert 'aggregateWindow(every: 1h, fn: sum' in query and 'fn: first' not in query
+    assert 'keep(columns: ["_time", "ticker", "high", "volume"])' in query
+
+
+def test_query_bars_and_chunked_iteration_agree():
+    from benchmarks.influx_standin import InfluxStandIn
+    frames = {t: make_query_frame(250).assign(close=lambda d, s=s: d["close"] / 3 + s)
+              for s, t in enumerate(["AAPL", "SPY"])}
+    with InfluxStandIn() as standin:
+        standin.frames.update(frames)
+        handler = DataHandler(url=standin.url, token="test")
+        bars = handler.query_bars(["AAPL", "SPY", "MSFT"], start_time="-1d")
+        chunks = list(handler.iter_bars(["AAPL", "SPY"], start_time="-1d", chunk_rows=100))
+        handler.close()
+    assert bars.index.names == ["ticker", "time"] and len(bars) == 500
+    assert np.array_equal(bars.loc["SPY", "close"].to_numpy(), frames["SPY"]["close"].to_numpy())
+    assert [len(c) for c in chunks] == [100] * 5
+    pd.testing.assert_frame_equal(pd.concat(chunks), bars)
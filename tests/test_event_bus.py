@@ -0,0 +1,173 @@
+
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+from main import run_realtime
+from utils.event_bus import BarBus, BarEvent, ReplaySource
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.rows = {}
+
+    def write_bulk_to_influxdb(self, frames, invalidate_cache=True, **options):
+        for ticker, df in frames.items():
+            self.rows[ticker] = self.rows.get(ticker, 0) + len(df)
+
+
+def make_bars(periods=120, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.2, periods))
+    return pd.DataFrame({
+        "time": pd.date_range("2023-01-02 14:30", periods=periods, freq="1min", tz="UTC"),
+        "Open": close, "High": close + 0.1, "Low": close - 0.1, "Close": close, "Volume": 100,
+    })
+
+
+def test_bus_drops_oldest_for_slow_consumer():
+    async def scenario():
+        bus = BarBus(maxsize=2)
+        queue = bus.subscribe("slow")
+        for i in range(5):
+            bus.publish(BarEvent("AAPL", i, 1.0, 1.0, 1.0, float(i), 1))
+        return [queue.get_nowait().close for _ in range(2)], bus.stats()["slow"]["dropped"]
+
+    closes, dropped = asyncio.run(scenario())
+    assert closes == [3.0, 4.0] and dropped == 3
+
+
+def test_realtime_replay_reaches_strategies_and_sink():
+    handler = RecordingHandler()
+    replay = ReplaySource({"AAPL": make_bars(), "SPY": make_bars(seed=4)})
+    latency = asyncio.run(run_realtime(handler, "AAPL", "SPY", None, None, logging.getLogger("test"), replay=replay))
+    assert latency.summary()["count"] == 240
+    assert handler.rows == {"AAPL": 120, "SPY": 120}
+
+
+def test_ring_buffer_wraps_dedupes_and_returns_views():
+    from utils.ring_buffer import BarRingBuffer
+    buffer = BarRingBuffer(capacity=4)
+    for t in range(6):
+        buffer.append(t, t, t, t, float(t), 1)
+    assert buffer.append(5, 5, 5, 5, 50.0, 1) and not buffer.append(2, 2, 2, 2, 2.0, 1)
+    assert buffer.times().tolist() == [2, 3, 4, 5]
+    assert buffer.column("close").tolist() == [2.0, 3.0, 4.0, 50.0]
+    assert buffer.column("close", 2).tolist() == [4.0, 50.0]
+    assert buffer.index_of(4) == 2 and buffer.index_of(1) is None
+    assert (buffer.replaced, buffer.rejected) == (1, 1)
+    # windows are views into the preallocated storage, not copies
+    assert np.shares_memory(buffer.window()["close"], buffer._data)
+
+
+def test_async_writer_batches_against_standin():
+    from benchmarks.influx_standin import InfluxStandIn
+    from utils.async_writer import AsyncInfluxWriter
+    from utils.data_handler import DataHandler
+    df = make_bars(120)
+
+    async def scenario(handler):
+        writer = AsyncInfluxWriter(handler, batch_size=50, flush_interval=0.05)
+        writer.start()
+        for row in df.itertuples(index=False):
+            writer.submit(BarEvent("AAPL", row.time, row.Open, row.High, row.Low, row.Close, row.Volume))
+        await writer.close()
+        return writer.stats()
+
+    with InfluxStandIn() as standin:
+        handler = DataHandler(url=standin.url, token="test")
+        stats = asyncio.run(scenario(handler))
+        handler.close()
+    assert stats == {"queued": 0, "written": 120, "dropped": 0}
+    assert standin.lines == 120 and standin.writes == 3
+
+
+def test_async_writer_drops_oldest_and_flushes_on_close():
+    from benchmarks.influx_standin import InfluxStandIn
+    from utils.async_writer import AsyncInfluxWriter
+    from utils.data_handler import DataHandler
+    with InfluxStandIn() as standin:
+        handler = DataHandler(url=standin.url, token="test")
+        writer = AsyncInfluxWriter(handler, maxsize=10)
+        handler._writers.append(writer)
+        for i, row in enumerate(make_bars(15).itertuples(index=False)):
+            writer.submit(BarEvent("AAPL", row.time, 1.0, 1.0, 1.0, float(i), 1))
+        assert writer.dropped == 5
+        handler.close()
+    assert standin.lines == 10 and writer.written == 10
+
+
+def test_async_writers_send_from_their_own_thread_and_label_the_queue_gauge():
+    import threading
+    from utils.async_writer import AsyncInfluxWriter
+    from utils.metrics import WRITER_QUEUED
+
+    class ThreadRecorder(RecordingHandler):
+        def __init__(self):
+            super().__init__()
+            self.calls = []
+
+        def write_bulk_to_influxdb(self, frames, invalidate_cache=True, **options):
+            self.calls.append((threading.current_thread().name, options.get("max_in_flight")))
+            super().write_bulk_to_influxdb(frames, invalidate_cache)
+
+    async def scenario(handler):
+        writers = [AsyncInfluxWriter(handler, batch_size=10, flush_interval=0.01, name=name) for name in ("AAPL", "SPY")]
+        for i, row in enumerate(make_bars(30).itertuples(index=False)):
+            writers[0].submit(BarEvent("AAPL", row.time, 1.0, 1.0, 1.0, float(i), 1))
+        writers[1].submit(BarEvent("SPY", row.time, 1.0, 1.0, 1.0, 1.0, 1))
+        queued = WRITER_QUEUED.value(writer="AAPL"), WRITER_QUEUED.value(writer="SPY")
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            await writer.close()
+        return queued, writers
+
+    handler = ThreadRecorder()
+    queued, writers = asyncio.run(scenario(handler))
+    assert queued == (30, 1)
+    assert handler.rows == {"AAPL": 30, "SPY": 1}
+    # every batch is sent inline on its writer's one send thread, which close() stops
+    threads = sorted(name.rsplit("_", 1)[0] for name, _ in handler.calls)
+    assert threads == ["influx-writer-AAPL"] * 3 + ["influx-writer-SPY"]
+    assert all(max_in_flight == 1 for _, max_in_flight in handler.calls)
+    assert all(writer._executor is None for writer in writers)
+
+
+def test_realtime_ignores_repeated_and_stale_bars(monkeypatch):
+    from strategies.mean_reversion import MeanReversionStrategy
+    from strategies.momentum import MomentumStrategy
+    seen = {}
+    for cls in (MomentumStrategy, MeanReversionStrategy):
+        def update(self, bar, original=cls.update):
+            seen[type(self)] = self
+            return original(self, bar)
+        monkeypatch.setattr(cls, "update", update)
+
+    bars = make_bars()
+    stale = bars.iloc[[50]].assign(time=bars["time"].iloc[-1])  # same timestamp as the last bar
+    repeated = pd.concat([bars, bars.iloc[::7], stale])
+    replay = ReplaySource({"AAPL": repeated, "SPY": make_bars(seed=4)})
+    asyncio.run(run_realtime(RecordingHandler(), "AAPL", "SPY", None, None, logging.getLogger("test"), replay=replay))
+
+    # the strategies end in the same state as after seeing every bar exactly once
+    expected_momentum, expected_bands = MomentumStrategy(window=10), MeanReversionStrategy(window=20)
+    for row in bars.rename(columns=str.lower).itertuples(index=False):
+        expected_momentum.update(row)
+        expected_bands.update(row)
+    momentum, bands = seen[MomentumStrategy], seen[MeanReversionStrategy]
+    assert momentum._closes.count == expected_momentum._closes.count == 120
+    assert momentum.momentum == expected_momentum.momentum
+    assert (bands.sma, bands.std) == (expected_bands.sma, expected_bands.std)
+
+
+def test_realtime_arbitrage_signals_once_per_pair_in_either_order(monkeypatch):
+    from strategies.arbitrage import ArbitrageStrategy
+    aapl, spy = make_bars(), make_bars(seed=4)
+    for frames in ({"AAPL": aapl, "SPY": spy}, {"SPY": spy, "AAPL": aapl}):
+        pairs = []
+        monkeypatch.setattr(ArbitrageStrategy, "signal", lambda self, c1, c2: pairs.append((c1, c2)) or 0)
+        asyncio.run(run_realtime(RecordingHandler(), "AAPL", "SPY", None, None, logging.getLogger("test"),
+                                 replay=ReplaySource(frames)))
+        # ReplaySource keeps the frames' order within a minute, so the second run delivers SPY first
+        assert pairs == list(zip(aapl["Close"], spy["Close"]))
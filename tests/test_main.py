@@ -0,0 +1,66 @@
+
+import subprocess
+import sys
+import pytest
+import pandas as pd
+import main
+from benchmarks.synthetic import make_ohlcv
+from utils.metrics import STARTUP_SECONDS
+
+
+def test_import_main_defers_heavy_dependencies():
+    heavy = ["pandas", "backtrader", "matplotlib", "dash", "yfinance", "alpaca", "influxdb_client"]
+    code = f"import sys, main; print([m for m in {heavy!r} if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def store_bars(tmp_path, monkeypatch, bars, start):
+    monkeypatch.setattr("utils.data_handler.LOCAL_STORE_PATH", str(tmp_path / "store"))
+    monkeypatch.setattr("utils.data_handler.HISTORY_CACHE_PATH", str(tmp_path / "history"))
+    from utils.data_handler import DataHandler
+    queried = []
+    monkeypatch.setattr(DataHandler, "query_cached", lambda self, ticker, start_time: queried.append(ticker))
+    handler = DataHandler()
+    handler.write_to_store(make_ohlcv(bars, start=str(start.tz_localize(None)), capitalized=True), "AAPL")
+    return handler, queried
+
+
+def test_backtest_command_runs_from_local_store(tmp_path, monkeypatch):
+    # a store covering the whole 5-day window is used without asking InfluxDB
+    start = (pd.Timestamp.now(tz="UTC") - pd.Timedelta("5d") - pd.Timedelta("1h")).floor("min")
+    handler, queried = store_bars(tmp_path, monkeypatch, 5 * 1440 + 55, start)
+    assert handler.store_covers("AAPL", start + pd.Timedelta("1h"), pd.Timestamp.now(tz="UTC"))
+    assert handler._client is None
+
+    plot = tmp_path / "backtest.png"
+    assert main.main(["backtest", "--no-signals", "--plot", str(plot)]) == 0
+    assert plot.exists() and queried == []
+    assert STARTUP_SECONDS.value(command="backtest") > 0
+
+
+def test_backtest_command_prefers_influx_over_partial_store(tmp_path, monkeypatch, caplog):
+    start = (pd.Timestamp.now(tz="UTC") - pd.Timedelta("1d")).floor("min")
+    handler, queried = store_bars(tmp_path, monkeypatch, 300, start)
+    assert not handler.store_covers("AAPL", start - pd.Timedelta("4d"), pd.Timestamp.now(tz="UTC"))
+    # InfluxDB has nothing either, so the partial store is used with a warning
+    with caplog.at_level("INFO"):
+        assert main.main(["backtest", "--no-signals"]) == 0
+    assert queried == ["AAPL"]
+    assert "only partially covers" in caplog.text and f"from {start}" in caplog.text
+
+
+def test_parser_defaults():
+    args = main.build_parser().parse_args(["dashboard", "--port", "9000"])
+    assert (args.ticker1, args.ticker2, args.port, args.debug) == ("AAPL", "SPY", 9000, False)
+    assert args.run is main.dashboard_command
+
+
+def test_realtime_command_requires_credentials_and_never_logs_them(monkeypatch, caplog):
+    monkeypatch.setenv("ALPACA_API_KEY", "key-123")
+    monkeypatch.delenv("ALPACA_SECRET_KEY", raising=False)
+    monkeypatch.setattr(main, "run_realtime", lambda *args: pytest.fail("stream started without credentials"))
+    with caplog.at_level("INFO"):
+        assert main.main(["realtime"]) == 1
+    assert "key-123" not in caplog.text
+    assert "ALPACA_API_KEY is set" in caplog.text and "ALPACA_SECRET_KEY" in caplog.text
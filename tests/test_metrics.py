@@ -0,0 +1,45 @@
+import logging
+from utils.logger import RateLimitedLogger
+from utils.metrics import Registry, timed
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    rows = registry.counter("ingest_rows_total", "Bars written", ["path"])
+    latency = registry.histogram("query_seconds", "Query latency", ["method"], buckets=(0.1, 1.0))
+    rows.inc(5, path="bulk")
+    rows.inc(2, path="bulk")
+    latency.observe(0.05, method="q")
+    latency.observe(0.5, method="q")
+
+    @timed(latency, method="fn")
+    def work():
+        return 42
+
+    assert work() == 42 and latency.count(method="fn") == 1
+    text = registry.render()
+    assert 'ingest_rows_total{path="bulk"} 7' in text
+    assert 'query_seconds_bucket{method="q",le="0.1"} 1' in text
+    assert 'query_seconds_bucket{method="q",le="+Inf"} 2' in text
+    assert 'query_seconds_count{method="q"} 2' in text
+    assert "# TYPE query_seconds histogram" in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry(enabled=False)
+    latency = registry.histogram("h", "help")
+    with timed(latency):
+        pass
+    registry.counter("c", "help").inc()
+    assert latency.count() == 0 and registry.counter("c", "help").value() == 0
+
+
+def test_rate_limited_logger_suppresses_repeats(caplog):
+    logger = logging.getLogger("test_rate_limited")
+    hot = RateLimitedLogger(logger, interval=60)
+    with caplog.at_level(logging.INFO, logger="test_rate_limited"):
+        for i in range(5):
+            hot.info("signal %s", i)
+        hot.interval = 0
+        hot.info("signal %s", 5)
+    assert [r.getMessage() for r in caplog.records] == ["signal 0", "signal 5 (+4 similar)"]
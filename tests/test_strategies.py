@@ -1,7 +1,10 @@
 
 import pytest
+import numpy as np
 import pandas as pd
 from strategies.momentum import MomentumStrategy
+from strategies.mean_reversion import MeanReversionStrategy
+from strategies.arbitrage import ArbitrageStrategy
 
 def test_momentum_strategy():
     df = pd.DataFrame({
@@ -11,4 +14,69 @@ def test_momentum_strategy():
     strategy = MomentumStrategy(window=5)
     df_with_signals = strategy.generate_signals(df)
     assert "signal" in df_with_signals.columns
-    assert df_with_signals["signal"].iloc[-1] == -1  # Last signal should be sell
\ No newline at end of file
+    assert df_with_signals["signal"].iloc[-1] == -1  # Last signal should be sell
+
+def make_random_walk(periods=500, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "time": pd.date_range("2023-01-01", periods=periods, freq="1min"),
+        "close": 100 + np.cumsum(rng.normal(0, 0.5, periods)),
+    })
+
+
+def test_momentum_streaming_matches_batch():
+    df = make_random_walk()
+    batch = MomentumStrategy(window=10).generate_signals(df.copy())
+    strategy = MomentumStrategy(window=10)
+    streamed = [strategy.update(row) for _, row in df.iterrows()]
+    assert streamed == batch["signal"].tolist()
+    assert strategy.momentum == batch["momentum"].iloc[-1]
+
+
+def test_mean_reversion_streaming_matches_batch():
+    df = make_random_walk(2000)
+    batch = MeanReversionStrategy(window=20).generate_signals(df.copy())
+    strategy = MeanReversionStrategy(window=20)
+    streamed = [strategy.update({"close": c}) for c in df["close"]]
+    assert streamed == batch["signal"].tolist()
+    assert np.isclose(strategy.sma, batch["sma"].iloc[-1], rtol=1e-12)
+    assert np.isclose(strategy.std, batch["std"].iloc[-1], rtol=1e-9)
+
+
+def test_scan_pairs_matches_pairwise_generate_signals():
+    rng = np.random.default_rng(11)
+    times = pd.date_range("2023-01-01", periods=60, freq="1min")
+    frames = {
+        ticker: pd.DataFrame({"time": times, "close": base + np.cumsum(rng.normal(0, 0.3, len(times)))})
+        for ticker, base in [("AAPL", 100), ("MSFT", 101), ("SPY", 99), ("QQQ", 100.5)]
+    }
+    strategy = ArbitrageStrategy("AAPL", "SPY", threshold=0.005)
+    pairs = strategy.scan_pairs(strategy.build_panel(frames), top_n=10, zscore_window=20, corr_window=20)
+    assert len(pairs) == 6
+    assert pairs["zscore"].abs().is_monotonic_decreasing
+    for row in pairs.itertuples():
+        expected = ArbitrageStrategy(row.ticker1, row.ticker2, threshold=0.005).generate_signals(
+            frames[row.ticker1], frames[row.ticker2]).iloc[-1]
+        assert row.spread == pytest.approx(expected["spread"])
+        assert row.signal == expected["signal"]
+
+
+def test_strategy_set_matches_generate_signals_and_shares_indicators():
+    from strategies.indicators import StrategySet
+    df = make_random_walk(300)
+    strategies = StrategySet({
+        "momentum": MomentumStrategy(window=10),
+        "bands_2": MeanReversionStrategy(window=20, std_dev=2.0),
+        "bands_1": MeanReversionStrategy(window=20, std_dev=1.0),
+    })
+    # sma_20 and std_20 are shared by both mean-reversion variants
+    assert len(strategies.plan()) == 7
+    signals, indicators = strategies.evaluate(df["close"].to_numpy())
+    assert len(indicators.values) == 7 and signals.shape == (3, 300)
+
+    frame = strategies.frame(df)
+    for name, strategy in strategies.strategies.items():
+        expected = strategy.generate_signals(df.copy())
+        assert (frame[name].to_numpy() == expected["signal"].to_numpy()).all()
+    expected = MeanReversionStrategy(window=20).generate_signals(df.copy())
+    assert np.allclose(frame["upper_band_20_2.0"], expected["upper_band"], equal_nan=True)
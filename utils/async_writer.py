@@ -0,0 +1,136 @@
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+import asyncio
+import pandas as pd
+from utils.logger import setup_logger
+from utils.metrics import WRITER_DROPPED, WRITER_QUEUED
+
+
+def bars_to_frames(batch: list) -> Dict[str, pd.DataFrame]:
+    # Group bar events by ticker into the yfinance-style frames write_bulk_to_influxdb accepts
+    rows = {}
+    for bar in batch:
+        rows.setdefault(bar.ticker, []).append((bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume))
+    return {ticker: pd.DataFrame(values, columns=["time", "Open", "High", "Low", "Close", "Volume"])
+            for ticker, values in rows.items()}
+
+
+class AsyncInfluxWriter:
+    # Non-blocking InfluxDB writes for live bars. submit() only enqueues, so the websocket
+    # callback never waits on HTTP; a background task collects micro-batches of up to
+    # batch_size bars or flush_interval seconds and sends each with write_bulk_to_influxdb on
+    # the writer's own send thread, kept for its lifetime instead of one pool per batch. The
+    # queue is bounded: when it is full the oldest bar is dropped. name labels this writer's
+    # metrics (e.g. the ticker).
+    def __init__(self, data_handler, batch_size: int = 500, flush_interval: float = 0.2, maxsize: int = 10000,
+                 name: str = "influx"):
+        self.data_handler = data_handler
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.written = 0
+        self.dropped = 0
+        self.logger = setup_logger(__name__)
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, bar) -> bool:
+        # Call from the event loop; returns False when an older bar had to be dropped
+        dropped = self.queue.full()
+        if dropped:
+            self.queue.get_nowait()
+            self._drop(1, "queue_full")
+        self.queue.put_nowait(bar)
+        WRITER_QUEUED.set(self.queue.qsize(), writer=self.name)
+        return not dropped
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def close(self):
+        # Flush everything submitted so far and stop the background task
+        if self._task is not None and not self._task.done():
+            await self.queue.put(None)
+            await self._task
+        self._task = None
+        self._shutdown()
+
+    def drain(self):
+        # Synchronous last-resort flush, e.g. from DataHandler.close() after the event loop stopped
+        batch = []
+        while not self.queue.empty():
+            bar = self.queue.get_nowait()
+            if bar is not None:
+                batch.append(bar)
+        if batch:
+            self._write(batch)
+        self._shutdown()
+
+    async def run(self, queue: Optional[asyncio.Queue] = None):
+        # Consume bars until None arrives; each batch starts with the first bar after a flush
+        queue = queue or self.queue
+        loop = asyncio.get_running_loop()
+        try:
+            await self._consume(queue, loop)
+        finally:
+            await loop.run_in_executor(None, self._shutdown)
+
+    async def _consume(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        done = False
+        while not done:
+            bar = await queue.get()
+            if bar is None:
+                break
+            batch = [bar]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not queue.empty():
+                    bar = queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        bar = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if bar is None:
+                    done = True
+                    break
+                batch.append(bar)
+            WRITER_QUEUED.set(queue.qsize(), writer=self.name)
+            await loop.run_in_executor(self._send_thread(), partial(self._write, batch))
+
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+    def _write(self, batch: List):
+        try:
+            # already off the event loop, so the batch is sent inline rather than handed on again
+            self.data_handler.write_bulk_to_influxdb(bars_to_frames(batch), invalidate_cache=False,
+                                                     max_in_flight=1)
+            self.written += len(batch)
+        except Exception as e:
+            self.logger.error(f"Failed to persist {len(batch)} bars: {e}")
+            self._drop(len(batch), "write_failed")
+
+    def _drop(self, n: int, reason: str):
+        self.dropped += n
+        WRITER_DROPPED.inc(n, writer=self.name, reason=reason)
+
+    def _send_thread(self) -> ThreadPoolExecutor:
+        # One thread: batches are written one at a time and in order, as before
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"influx-writer-{self.name}")
+        return self._executor
+
+    def _shutdown(self):
+        # Stop the send thread; drain() writes in the calling thread and does not need it
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
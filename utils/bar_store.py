@@ -0,0 +1,128 @@
+
+from typing import Dict, List, Optional
+import os
+import numpy as np
+import pandas as pd
+from utils.logger import setup_logger
+
+COLUMNS = ["time", "close", "open", "high", "low", "volume"]
+_PARTITION_UNITS = {"month": "M", "day": "D"}
+
+
+def _to_ns(ts) -> Optional[int]:
+    if ts is None:
+        return None
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_convert("UTC") if ts.tzinfo else ts.tz_localize("UTC")
+    return ts.value
+
+
+class BarStore:
+    # Local columnar store: <root>/<ticker>/<partition>/<column>.npy with one partition per month
+    # (or day). Reads memory-map the column files, prune partitions outside the time range and
+    # binary-search the sorted time column, so only the requested slice is paged in.
+    def __init__(self, root: str, partition: str = "month"):
+        if partition not in _PARTITION_UNITS:
+            raise ValueError(f"partition must be one of {list(_PARTITION_UNITS)}")
+        self.root = root
+        self.partition = partition
+        self.logger = setup_logger(__name__)
+
+    def tickers(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def partitions(self, ticker: str) -> List[str]:
+        path = os.path.join(self.root, ticker)
+        if not os.path.isdir(path):
+            return []
+        return sorted(p for p in os.listdir(path) if os.path.exists(os.path.join(path, p, "time.npy")))
+
+    def write(self, df: pd.DataFrame, ticker: str) -> int:
+        # Accepts yfinance (capitalized) or InfluxDB (lower-case) frames; merges into existing
+        # partitions, keeping the newest row for duplicate timestamps.
+        df = df.rename(columns=str.lower)
+        times = pd.to_datetime(df["time"], utc=True).astype("datetime64[ns, UTC]").astype("int64").to_numpy()
+        values = {col: df[col].to_numpy(dtype="float64") for col in COLUMNS[1:]}
+        keys = times.astype("datetime64[ns]").astype(f"datetime64[{_PARTITION_UNITS[self.partition]}]")
+        for key in np.unique(keys):
+            mask = keys == key
+            part = {"time": times[mask], **{col: v[mask] for col, v in values.items()}}
+            self._merge_partition(ticker, str(key), part)
+        self.logger.info(f"Stored {len(df)} rows for {ticker} in {self.root}")
+        return len(df)
+
+    def read_arrays(self, ticker: str, start=None, end=None,
+                    columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        # Columns for start <= time < end. Within a single partition the arrays are read-only
+        # views of the memory-mapped files; spanning partitions concatenates the slices.
+        columns = ["time"] + [c for c in (columns or COLUMNS[1:]) if c != "time"]
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        pieces = {col: [] for col in columns}
+        for part in self._overlapping(ticker, start_ns, end_ns):
+            path = os.path.join(self.root, ticker, part)
+            times = np.load(os.path.join(path, "time.npy"), mmap_mode="r")
+            lo = 0 if start_ns is None else int(np.searchsorted(times, start_ns, side="left"))
+            hi = len(times) if end_ns is None else int(np.searchsorted(times, end_ns, side="left"))
+            if lo >= hi:
+                continue
+            for col in columns:
+                array = times if col == "time" else np.load(os.path.join(path, f"{col}.npy"), mmap_mode="r")
+                pieces[col].append(array[lo:hi])
+        result = {}
+        for col, arrays in pieces.items():
+            dtype = "int64" if col == "time" else "float64"
+            if not arrays:
+                result[col] = np.empty(0, dtype=dtype)
+            else:
+                result[col] = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+        return result
+
+    def read(self, ticker: str, start=None, end=None, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        # Same column layout as DataHandler.query_influxdb. pandas consolidates the float columns,
+        # so this copies the selected slice once; use read_arrays() for zero-copy access.
+        arrays = self.read_arrays(ticker, start, end, columns)
+        if len(arrays["time"]) == 0:
+            return None
+        data = {"time": pd.to_datetime(arrays.pop("time"), utc=True)}
+        data.update(arrays)
+        return pd.DataFrame(data)
+
+    def first_timestamp(self, ticker: str) -> Optional[pd.Timestamp]:
+        parts = self.partitions(ticker)
+        if not parts:
+            return None
+        times = np.load(os.path.join(self.root, ticker, parts[0], "time.npy"), mmap_mode="r")
+        return pd.Timestamp(int(times[0]), tz="UTC") if len(times) else None
+
+    def last_timestamp(self, ticker: str) -> Optional[pd.Timestamp]:
+        parts = self.partitions(ticker)
+        if not parts:
+            return None
+        times = np.load(os.path.join(self.root, ticker, parts[-1], "time.npy"), mmap_mode="r")
+        return pd.Timestamp(int(times[-1]), tz="UTC") if len(times) else None
+
+    def _overlapping(self, ticker: str, start_ns: Optional[int], end_ns: Optional[int]) -> List[str]:
+        unit = _PARTITION_UNITS[self.partition]
+        lo = None if start_ns is None else np.datetime64(start_ns, "ns").astype(f"datetime64[{unit}]")
+        hi = None if end_ns is None else np.datetime64(end_ns, "ns").astype(f"datetime64[{unit}]")
+        return [p for p in self.partitions(ticker)
+                if (lo is None or np.datetime64(p) >= lo) and (hi is None or np.datetime64(p) <= hi)]
+
+    def _merge_partition(self, ticker: str, key: str, part: Dict[str, np.ndarray]):
+        path = os.path.join(self.root, ticker, key)
+        if os.path.exists(os.path.join(path, "time.npy")):
+            existing = {col: np.load(os.path.join(path, f"{col}.npy")) for col in COLUMNS}
+            part = {col: np.concatenate([existing[col], part[col]]) for col in COLUMNS}
+        # stable sort, then keep the last occurrence of each timestamp (the newest write)
+        order = np.argsort(part["time"], kind="stable")
+        times = part["time"][order]
+        keep = np.append(times[1:] != times[:-1], True)
+        os.makedirs(path, exist_ok=True)
+        # time.npy is replaced last: readers only see a partition once its time column exists
+        for col in COLUMNS[1:] + ["time"]:
+            target = os.path.join(path, f"{col}.npy")
+            with open(target + ".tmp", "wb") as f:
+                np.save(f, part[col][order][keep])
+            os.replace(target + ".tmp", target)
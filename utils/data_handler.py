@@ -1,11 +1,18 @@
 # utils/data_handler.py
-from typing import Optional
-import yfinance as yf
+from typing import Dict, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import numpy as np
 import pandas as pd
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
-from utils.logger import setup_logger
-from alpaca.data.live import StockDataStream
+from utils.logger import RateLimitedLogger, setup_logger
+from utils.metrics import INGEST_BYTES, INGEST_RETRIES, INGEST_ROWS, QUERY_SECONDS, timed
+from utils.query_cache import QueryCache, to_flux_time
+from utils.bar_store import BarStore
+from utils.flux_query import OHLCV_FIELDS, build_flux_query, iter_csv_chunks, to_bars
+from utils.history import ResponseCache, YFinanceProvider, gap_ranges, missing_rows
+from utils.event_bus import BarEvent
+from utils.async_writer import AsyncInfluxWriter
 import asyncio
 import os
 
@@ -13,24 +20,162 @@ INFLUX_URL = "http://localhost:8086"
 INFLUX_TOKEN = os.environ.get("INFLUXDB_TOKEN")
 INFLUX_ORG = "onchana"
 INFLUX_BUCKET = "trading_data"
+LOCAL_STORE_PATH = os.environ.get("LOCAL_STORE_PATH", "data/store")
+HISTORY_CACHE_PATH = os.environ.get("HISTORY_CACHE_PATH", "data/history")
+HISTORY_CACHE_TTL = float(os.environ.get("HISTORY_CACHE_TTL", "3600"))
+
+PRICE_FIELDS = ["Open", "High", "Low", "Close"]
+_ESCAPE_MEASUREMENT = str.maketrans({",": r"\,", " ": r"\ "})
+_ESCAPE_TAG = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ "})
+
+
+def _float_field(values: pd.Series) -> pd.Series:
+    # Same formatting as influxdb_client.Point: str(float) without a trailing ".0".
+    # Mapping str over a plain list is several times faster than Series.astype(str).
+    array = values.to_numpy()
+    text = list(map(str, array.tolist()))
+    for i in np.flatnonzero((array == np.trunc(array)) & (np.abs(array) < 1e16)):
+        text[i] = text[i][:-2]
+    return pd.Series(text, index=values.index, dtype=object)
+
+
+def to_line_protocol(df: pd.DataFrame, ticker: str, measurement: str = "stock_data") -> pd.Series:
+    # Serialize a whole OHLCV frame to line protocol with column operations instead of one Point per row.
+    prices = df[PRICE_FIELDS].astype("float64")
+    valid = np.isfinite(prices.to_numpy()).all(axis=1) & df["Volume"].notna().to_numpy()
+    if not valid.all():
+        df, prices = df[valid], prices[valid]
+    prefix = f"{measurement.translate(_ESCAPE_MEASUREMENT)},ticker={ticker.translate(_ESCAPE_TAG)} "
+    timestamps = pd.to_datetime(df["time"], utc=True, cache=False).astype("datetime64[ns, UTC]").astype("int64")
+    return (
+        prefix
+        + "close=" + _float_field(prices["Close"])
+        + ",high=" + _float_field(prices["High"])
+        + ",low=" + _float_field(prices["Low"])
+        + ",open=" + _float_field(prices["Open"])
+        + ",volume=" + pd.Series(list(map(str, df["Volume"].astype("int64").tolist())), index=df.index) + "i "
+        + pd.Series(list(map(str, timestamps.tolist())), index=df.index)
+    )
 
 class DataHandler:
-    def __init__(self):
+    def __init__(self, url: str = INFLUX_URL, token: Optional[str] = INFLUX_TOKEN, provider=None):
+        # provider: historical data source with fetch(ticker, period, interval), yfinance by default
         self.logger = setup_logger(__name__)
-        self.client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
-        self.query_api = self.client.query_api()
+        self.hot_logger = RateLimitedLogger(self.logger)
+        self.url = url
+        self.token = token
+        self.cache = QueryCache(self)
+        self.store = BarStore(LOCAL_STORE_PATH)
+        self.provider = provider or YFinanceProvider()
+        self.history_cache = ResponseCache(HISTORY_CACHE_PATH, ttl=HISTORY_CACHE_TTL)
+        self._writers: List[AsyncInfluxWriter] = []
+        self._client_lock = threading.RLock()  # reentrant: the APIs create the client under it
+        self._client = self._write_api = self._query_api = None
+
+    # The InfluxDB client and its APIs are created on first use, so commands that only read the
+    # local store or the history cache never import influxdb_client or open a connection.
+    # Creation is locked: backfill, fetch_many and bulk writes reach these from worker threads,
+    # and an unlocked first use could build several clients of which close() sees only one.
+    def _lazy(self, name: str, factory):
+        value = getattr(self, name)
+        if value is None:
+            with self._client_lock:
+                value = getattr(self, name)
+                if value is None:
+                    value = factory()
+                    setattr(self, name, value)
+        return value
+
+    @property
+    def client(self):
+        def connect():
+            from influxdb_client import InfluxDBClient
+            return InfluxDBClient(url=self.url, token=self.token, org=INFLUX_ORG)
+        return self._lazy("_client", connect)
+
+    @property
+    def write_api(self):
+        def synchronous():
+            from influxdb_client.client.write_api import SYNCHRONOUS
+            return self.client.write_api(write_options=SYNCHRONOUS)
+        return self._lazy("_write_api", synchronous)
+
+    @write_api.setter
+    def write_api(self, value):
+        self._write_api = value
+
+    @property
+    def query_api(self):
+        return self._lazy("_query_api", lambda: self.client.query_api())
+
+    @query_api.setter
+    def query_api(self, value):
+        self._query_api = value
 
     def fetch_yfinance_data(self, ticker: str, period: str = "1d", interval: str = "1m") -> pd.DataFrame:
         self.logger.info(f"Fetching data for {ticker}...")
-        stock = yf.Ticker(ticker)
-        df = stock.history(period=period, interval=interval)
-        df.reset_index(inplace=True)
-        df.rename(columns={"Datetime": "time"}, inplace=True)
-        return df[["time", "Open", "High", "Low", "Close", "Volume"]]
+        return YFinanceProvider().fetch(ticker, period=period, interval=interval)
+
+    def fetch_many(self, tickers: List[str], period: str = "1d", interval: str = "1m",
+                   max_workers: int = 8, use_cache: bool = True) -> Dict[str, pd.DataFrame]:
+        # Historical bars for many tickers from self.provider, fetched concurrently by a bounded
+        # thread pool. Responses are kept in the on-disk history cache for HISTORY_CACHE_TTL
+        # seconds, so restarts within that window do not download them again.
+        # Tickers that fail or return no rows are logged and left out of the result.
+        start = time.perf_counter()
+
+        def fetch(ticker: str) -> tuple:
+            df = self.history_cache.get(ticker, period, interval) if use_cache else None
+            if df is not None:
+                return df, True
+            try:
+                df = self.provider.fetch(ticker, period=period, interval=interval)
+            except Exception as e:
+                self.logger.error(f"Failed to fetch {ticker}: {e}")
+                return None, False
+            if df is None or df.empty:
+                self.logger.warning(f"No data returned for {ticker}")
+                return None, False
+            if use_cache:
+                self.history_cache.put(ticker, period, interval, df)
+            return df, False
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = dict(zip(tickers, executor.map(fetch, tickers)))
+        frames = {ticker: df for ticker, (df, _) in results.items() if df is not None}
+        hits = sum(cached for _, cached in results.values())
+        self.logger.info(f"Fetched {len(frames)}/{len(tickers)} tickers ({hits} from cache) "
+                         f"in {time.perf_counter() - start:.2f}s")
+        return frames
+
+    def backfill_influxdb(self, frames: Dict[str, pd.DataFrame], max_workers: int = 8,
+                          **write_options) -> Dict[str, int]:
+        # Write only the rows InfluxDB does not have yet: each ticker's stored timestamps over the
+        # frame's time range are queried (concurrently), and the missing rows go through
+        # write_bulk_to_influxdb. Returns the number of rows written per ticker.
+        def missing(item):
+            ticker, df = item
+            if df.empty:
+                return ticker, df
+            stored = self.query_influxdb(ticker, start_time=to_flux_time(pd.Timestamp(df["time"].min())))
+            mask = missing_rows(df["time"], None if stored is None else stored["time"])
+            gaps = gap_ranges(df["time"], mask)
+            if gaps:
+                self.logger.info(f"{ticker}: {int(mask.sum())} missing rows in {len(gaps)} gaps, "
+                                 f"first {gaps[0][0]} - {gaps[0][1]}")
+            return ticker, df[mask]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            gaps = {ticker: df for ticker, df in executor.map(missing, frames.items()) if not df.empty}
+        if gaps:
+            self.write_bulk_to_influxdb(gaps, **write_options)
+        written = {ticker: len(gaps.get(ticker, ())) for ticker in frames}
+        self.logger.info(f"Backfilled {sum(written.values())} rows for {len(gaps)}/{len(frames)} tickers")
+        return written
 
     def write_to_influxdb(self, df: pd.DataFrame, ticker: str, measurement: str = "stock_data"):
-        self.logger.info(f"Writing data for {ticker} to InfluxDB...")
+        from influxdb_client import Point
+        self.hot_logger.info("Writing data for %s to InfluxDB...", ticker)
         points = [
             Point(measurement)
             .tag("ticker", ticker)
@@ -43,20 +188,92 @@ class DataHandler:
             for _, row in df.iterrows()
         ]
         self.write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=points)
+        INGEST_ROWS.inc(len(points), path="per_row")
+
+    def write_bulk_to_influxdb(self, frames: Dict[str, pd.DataFrame], measurement: str = "stock_data",
+                               batch_size: int = 5000, max_in_flight: int = 4, max_retries: int = 3,
+                               retry_interval: float = 1.0, invalidate_cache: bool = True) -> Dict[str, float]:
+        # Bulk ingest for many tickers: vectorized line protocol, fixed-size batches sent from a
+        # small thread pool. At most max_in_flight batches are queued, so serialization waits for
+        # the network instead of buffering the whole history in memory. max_in_flight=1 sends
+        # inline in the calling thread, e.g. from AsyncInfluxWriter's own send thread.
+        # Historical backfills can land before the cached tail; live bars (invalidate_cache=False) cannot
+        if invalidate_cache:
+            for ticker in frames:
+                self.cache.invalidate(ticker)
+        self.hot_logger.info("Bulk writing %d tickers to InfluxDB (batch_size=%d)...", len(frames), batch_size)
+        slots = threading.BoundedSemaphore(max_in_flight)
+        rows = 0
+        sent_bytes = 0
+        batches = 0
+        futures = []
+        start = time.perf_counter()
+
+        def send(payload: str):
+            try:
+                for attempt in range(max_retries + 1):
+                    try:
+                        self.write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=payload)
+                        return
+                    except Exception as e:
+                        if attempt == max_retries:
+                            raise
+                        delay = retry_interval * 2 ** attempt
+                        INGEST_RETRIES.inc()
+                        self.logger.warning(f"Batch write failed ({e}), retrying in {delay:.1f}s")
+                        time.sleep(delay)
+            finally:
+                slots.release()
+
+        pool = ThreadPoolExecutor(max_workers=max_in_flight) if max_in_flight > 1 else None
+        try:
+            for payload, n in self._line_batches(frames, measurement, batch_size):
+                slots.acquire()
+                if pool is None:
+                    send(payload)
+                else:
+                    futures.append(pool.submit(send, payload))
+                rows += n
+                sent_bytes += len(payload.encode())
+                batches += 1
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+        for future in futures:
+            future.result()
 
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        INGEST_ROWS.inc(rows, path="bulk")
+        INGEST_BYTES.inc(sent_bytes, path="bulk")
+        stats = {
+            "rows": rows,
+            "bytes": sent_bytes,
+            "batches": batches,
+            "seconds": elapsed,
+            "rows_per_sec": rows / elapsed,
+            "bytes_per_sec": sent_bytes / elapsed,
+        }
+        self.hot_logger.info("Bulk write done: %d rows, %d bytes in %.2fs (%.0f rows/s, %.2f MB/s)",
+                             rows, sent_bytes, elapsed, stats["rows_per_sec"], stats["bytes_per_sec"] / 1e6)
+        return stats
+
+    def _line_batches(self, frames: Dict[str, pd.DataFrame], measurement: str,
+                      batch_size: int) -> Iterator[tuple]:
+        for ticker, df in frames.items():
+            lines = to_line_protocol(df, ticker, measurement).tolist()
+            if len(lines) < len(df):
+                self.logger.warning(f"Skipped {len(df) - len(lines)} rows with missing values for {ticker}")
+            for i in range(0, len(lines), batch_size):
+                batch = lines[i:i + batch_size]
+                yield "\n".join(batch), len(batch)
+
+    @timed(QUERY_SECONDS, method="query_influxdb")
     def query_influxdb(self, ticker: str, start_time: str = "-1d") -> Optional[pd.DataFrame]:
-        query = f'''
-        from(bucket: "{INFLUX_BUCKET}")
-            |> range(start: {start_time})
-            |> filter(fn: (r) => r["_measurement"] == "stock_data")
-            |> filter(fn: (r) => r["ticker"] == "{ticker}")
-            |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
-        '''
-        self.logger.info(f"Querying data for {ticker} with query: {query}")
+        query = build_flux_query(INFLUX_BUCKET, [ticker], start_time)
+        self.logger.debug("Querying data for %s with query: %s", ticker, query)
         try:
             result = self.query_api.query_data_frame(query)
-            self.logger.info(f"Query result shape: {result.shape if not result.empty else 'empty'}")
-            self.logger.info(f"Query result columns: {list(result.columns) if not result.empty else 'none'}")
+            self.hot_logger.info("Query for %s returned %s", ticker, result.shape if not result.empty else "no rows")
             if result.empty:
                 self.logger.warning(f"No data returned for {ticker}")
                 return None
@@ -71,25 +288,97 @@ class DataHandler:
             self.logger.error(f"Query failed: {str(e)}")
             return None
 
+    @timed(QUERY_SECONDS, method="query_bars")
+    def query_bars(self, tickers: List[str], start_time="-1d", stop_time=None,
+                   fields: Optional[List[str]] = None, every: Optional[str] = None) -> Optional[pd.DataFrame]:
+        # Bars for several tickers in one query, indexed by (ticker, time). Projection to fields and
+        # resampling to every (e.g. "5m", "1h") run in InfluxDB, see build_flux_query.
+        fields = fields or OHLCV_FIELDS
+        query = build_flux_query(INFLUX_BUCKET, tickers, start_time, stop_time, fields, every)
+        self.hot_logger.info("Querying %d tickers (every=%s, fields=%s)", len(tickers), every, fields)
+        try:
+            result = self.query_api.query_data_frame(query)
+        except Exception as e:
+            self.logger.error(f"Query failed: {str(e)}")
+            return None
+        if isinstance(result, list):
+            result = pd.concat(result, ignore_index=True) if result else pd.DataFrame()
+        if result.empty:
+            self.logger.warning(f"No data returned for {tickers}")
+            return None
+        return to_bars(result, fields)
+
+    def iter_bars(self, tickers: List[str], start_time="-1d", stop_time=None, fields: Optional[List[str]] = None,
+                  every: Optional[str] = None, chunk_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+        # Same query as query_bars, streamed through the client's CSV iterator and yielded in
+        # frames of at most chunk_rows rows, for ranges too large to hold in memory at once
+        from influxdb_client import Dialect
+        fields = fields or OHLCV_FIELDS
+        query = build_flux_query(INFLUX_BUCKET, tickers, start_time, stop_time, fields, every)
+        rows = self.query_api.query_csv(query, dialect=Dialect(header=True, annotations=[]))
+        yield from iter_csv_chunks(rows, fields, chunk_rows)
+
+    def write_to_store(self, df: pd.DataFrame, ticker: str) -> int:
+        return self.store.write(df, ticker)
+
+    def read_from_store(self, ticker: str, start=None, end=None, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        # Local, memory-mapped alternative to query_influxdb; start is inclusive, end exclusive
+        return self.store.read(ticker, start, end, columns)
+
+    def store_covers(self, ticker: str, start, end, max_lag: str = "15min") -> bool:
+        # True when the local store holds ticker's bars from at or before start up to within
+        # max_lag of end; a stale or partial store should not stand in for InfluxDB
+        first, last = self.store.first_timestamp(ticker), self.store.last_timestamp(ticker)
+        return (first is not None and first <= pd.Timestamp(start) and
+                last >= pd.Timestamp(end) - pd.Timedelta(max_lag))
+
+    @timed(QUERY_SECONDS, method="query_cached")
+    def query_cached(self, ticker: str, start_time: str = "-1d") -> Optional[pd.DataFrame]:
+        # Same result as query_influxdb, served from the per-ticker cache; only the missing tail is queried.
+        # The returned frame shares memory with the cache, so copy it before modifying in place.
+        return self.cache.get(ticker, start_time)
+
     async def stream_to_influxdb(self, ticker: str, api_key: str, secret_key: str):
+        # Live bars are handed to an AsyncInfluxWriter, so the websocket callback never blocks on
+        # an HTTP write; bars still queued are flushed when the stream ends or close() runs.
+        from alpaca.data.live import StockDataStream
         self.logger.info(f"Starting real-time stream for {ticker}...")
         stream = StockDataStream(api_key, secret_key)
+        writer = AsyncInfluxWriter(self, name=ticker)
+        self._writers.append(writer)
+        writer.start()
         
         async def handle_bar(bar):
-            data = {
-                "time": pd.Timestamp(bar.timestamp, tz="UTC"),
-                "Open": bar.open,
-                "High": bar.high,
-                "Low": bar.low,
-                "Close": bar.close,
-                "Volume": bar.volume
-            }
-            df = pd.DataFrame([data])
-            self.write_to_influxdb(df, ticker)
-            self.logger.debug(f"Received bar for {ticker}: {data['Close']}")
+            writer.submit(BarEvent.from_alpaca(bar))
+            self.logger.debug("Received bar for %s: %s", ticker, bar.close)
 
         stream.subscribe_bars(handle_bar, ticker)
-        await stream.run()
+        try:
+            # StockDataStream.run() starts its own event loop; we are already inside one
+            await stream._run_forever()
+        finally:
+            await writer.close()
+            self._writers.remove(writer)
+
+    async def stream_to_bus(self, bus, tickers: List[str], api_key: str, secret_key: str):
+        # Publish live Alpaca bars for all tickers on one websocket straight to the in-process bus
+        from alpaca.data.live import StockDataStream
+        self.logger.info(f"Starting real-time stream for {tickers}...")
+        stream = StockDataStream(api_key, secret_key)
+
+        async def handle_bar(bar):
+            bus.publish(BarEvent.from_alpaca(bar))
+
+        stream.subscribe_bars(handle_bar, *tickers)
+        try:
+            # StockDataStream.run() starts its own event loop; we are already inside one
+            await stream._run_forever()
+        finally:
+            await bus.close()
 
     def close(self):
-        self.client.close()
\ No newline at end of file
+        # Live bars still queued in async writers are written before the client goes away
+        for writer in self._writers:
+            writer.drain()
+        if self._client is not None:
+            self._client.close()
\ No newline at end of file
@@ -0,0 +1,142 @@
+
+from collections import deque
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import numpy as np
+import pandas as pd
+from utils.async_writer import AsyncInfluxWriter
+from utils.logger import setup_logger
+from utils.metrics import BAR_TO_SIGNAL_SECONDS
+
+
+class BarEvent:
+    # One OHLCV bar as it travels through the bus. received_at is a perf_counter() stamp taken
+    # when the bar entered the process, used to measure bar-to-signal latency.
+    __slots__ = ("ticker", "time", "open", "high", "low", "close", "volume", "received_at")
+
+    def __init__(self, ticker: str, time: pd.Timestamp, open: float, high: float, low: float,
+                 close: float, volume: float, received_at: Optional[float] = None):
+        self.ticker = ticker
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.received_at = received_at if received_at is not None else perf_counter()
+
+    @classmethod
+    def from_alpaca(cls, bar) -> "BarEvent":
+        return cls(bar.symbol, pd.Timestamp(bar.timestamp).tz_convert("UTC"), bar.open, bar.high, bar.low,
+                   bar.close, bar.volume)
+
+    def as_row(self) -> dict:
+        return {"time": self.time, "open": self.open, "high": self.high, "low": self.low,
+                "close": self.close, "volume": self.volume}
+
+
+class _Subscription:
+    __slots__ = ("name", "queue", "tickers", "dropped")
+
+    def __init__(self, name: str, queue: asyncio.Queue, tickers: Optional[set]):
+        self.name = name
+        self.queue = queue
+        self.tickers = tickers
+        self.dropped = 0
+
+
+class BarBus:
+    # In-process pub/sub for live bars. Every subscriber gets its own bounded asyncio.Queue;
+    # a slow consumer loses its oldest bars instead of stalling the feed and the other consumers.
+    # Consumers read until they receive None, which close() sends once the source is done.
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self.published = 0
+        self.logger = setup_logger(__name__)
+        self._subscriptions: List[_Subscription] = []
+
+    def subscribe(self, name: str, tickers: Optional[Iterable[str]] = None,
+                  maxsize: Optional[int] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=maxsize or self.maxsize)
+        self._subscriptions.append(_Subscription(name, queue, set(tickers) if tickers else None))
+        return queue
+
+    def publish(self, bar: BarEvent):
+        self.published += 1
+        for sub in self._subscriptions:
+            if sub.tickers is not None and bar.ticker not in sub.tickers:
+                continue
+            if sub.queue.full():
+                sub.queue.get_nowait()
+                sub.dropped += 1
+            sub.queue.put_nowait(bar)
+
+    async def close(self):
+        for sub in self._subscriptions:
+            await sub.queue.put(None)
+
+    def stats(self) -> Dict[str, dict]:
+        return {sub.name: {"queued": sub.queue.qsize(), "dropped": sub.dropped} for sub in self._subscriptions}
+
+
+class ReplaySource:
+    # Stands in for the Alpaca stream: publishes historical bars for several tickers in time order.
+    # interval is the pause between consecutive timestamps (0 replays as fast as possible).
+    def __init__(self, frames: Dict[str, pd.DataFrame], interval: float = 0.0):
+        self.frames = frames
+        self.interval = interval
+        self.logger = setup_logger(__name__)
+
+    def events(self) -> List[BarEvent]:
+        rows = []
+        for ticker, df in self.frames.items():
+            df = df.rename(columns=str.lower)
+            for row in df[["time", "open", "high", "low", "close", "volume"]].itertuples(index=False):
+                rows.append((row.time, ticker, row))
+        rows.sort(key=lambda r: r[0])
+        return [BarEvent(ticker, row.time, row.open, row.high, row.low, row.close, row.volume)
+                for _, ticker, row in rows]
+
+    async def run(self, bus: BarBus):
+        events = self.events()
+        self.logger.info(f"Replaying {len(events)} bars for {list(self.frames)}")
+        previous = None
+        for event in events:
+            if self.interval and previous is not None and event.time != previous:
+                await asyncio.sleep(self.interval)
+            previous = event.time
+            event.received_at = perf_counter()
+            bus.publish(event)
+            # let consumers run between bars, as they would between websocket messages
+            await asyncio.sleep(0)
+        await bus.close()
+
+
+class InfluxSink(AsyncInfluxWriter):
+    # Bus consumer that persists bars to InfluxDB in batches: run(queue) reads a bus subscription
+    # and writes through the executor, so the event loop keeps serving the feed and the strategies.
+    def __init__(self, data_handler, batch_size: int = 500, flush_interval: float = 1.0, name: str = "bus"):
+        super().__init__(data_handler, batch_size=batch_size, flush_interval=flush_interval, name=name)
+
+
+class LatencyRecorder:
+    # Collects bar-to-signal latencies (seconds) and summarizes them as percentiles
+    def __init__(self, maxlen: int = 100000):
+        self.samples = deque(maxlen=maxlen)
+
+    def record(self, received_at: float):
+        lag = perf_counter() - received_at
+        self.samples.append(lag)
+        BAR_TO_SIGNAL_SECONDS.observe(lag)
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {"count": 0}
+        values = np.array(self.samples) * 1e3
+        return {
+            "count": len(values),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p99_ms": float(np.percentile(values, 99)),
+            "max_ms": float(values.max()),
+        }
@@ -0,0 +1,90 @@
+
+from typing import Iterable, Iterator, List, Optional, Union
+import numpy as np
+import pandas as pd
+from utils.query_cache import to_flux_time
+
+OHLCV_FIELDS = ["open", "high", "low", "close", "volume"]
+# aggregateWindow function per field when resampling bars to a coarser interval
+AGGREGATES = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+
+def _flux_time(value: Union[str, pd.Timestamp]) -> str:
+    # Relative durations ("-5d") and RFC3339 strings pass through; timestamps are formatted
+    if isinstance(value, str):
+        return value
+    ts = pd.Timestamp(value)
+    return to_flux_time(ts if ts.tzinfo else ts.tz_localize("UTC"))
+
+
+def _any_of(column: str, values: Iterable[str]) -> str:
+    return " or ".join(f'r["{column}"] == "{value}"' for value in values)
+
+
+def build_flux_query(bucket: str, tickers: List[str], start: Union[str, pd.Timestamp] = "-1d",
+                     stop: Union[str, pd.Timestamp, None] = None, fields: Optional[List[str]] = None,
+                     every: Optional[str] = None, measurement: str = "stock_data") -> str:
+    # One query for all tickers. fields limits the columns InfluxDB sends back; every (e.g. "5m",
+    # "1h") resamples server-side with first/max/min/last/sum per OHLCV field, each window
+    # stamped with its start time, so only the aggregated bars cross the network.
+    fields = fields or OHLCV_FIELDS
+    stop_arg = f", stop: {_flux_time(stop)}" if stop is not None else ""
+    base = (f'from(bucket: "{bucket}")\n'
+            f'    |> range(start: {_flux_time(start)}{stop_arg})\n'
+            f'    |> filter(fn: (r) => r["_measurement"] == "{measurement}")\n'
+            f'    |> filter(fn: (r) => {_any_of("ticker", tickers)})\n'
+            f'    |> filter(fn: (r) => {_any_of("_field", fields)})')
+    if every is None:
+        query = base
+    else:
+        unknown = [field for field in fields if field not in AGGREGATES]
+        if unknown:
+            raise ValueError(f"No aggregate defined for fields {unknown}")
+        windows = ",\n".join(
+            f'    data |> filter(fn: (r) => r["_field"] == "{field}")'
+            f' |> aggregateWindow(every: {every}, fn: {AGGREGATES[field]}, createEmpty: false, timeSrc: "_start")'
+            for field in fields)
+        query = f"data = {base}\n\nunion(tables: [\n{windows},\n])"
+    columns = ", ".join(f'"{column}"' for column in ["_time", "ticker"] + fields)
+    return (f'{query}\n'
+            f'    |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")\n'
+            f'    |> keep(columns: [{columns}])')
+
+
+def to_bars(frame: pd.DataFrame, fields: List[str]) -> pd.DataFrame:
+    # Tidy (ticker, time) indexed bars from a pivoted query result
+    frame = frame.rename(columns={"_time": "time"})
+    frame["time"] = pd.to_datetime(frame["time"], utc=True)
+    columns = [field for field in fields if field in frame.columns]
+    frame = frame[["ticker", "time"] + columns].copy()
+    for column in columns:
+        if frame[column].dtype == object:
+            # CSV chunks arrive as strings; astype parses exactly like the client's own float()
+            values = frame[column].replace("", np.nan).astype("float64")
+            integral = column == "volume" and not values.isna().any()
+            frame[column] = values.astype("int64") if integral else values
+    return frame.set_index(["ticker", "time"]).sort_index()
+
+
+def iter_csv_chunks(rows: Iterator[List[str]], fields: List[str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    # Turn the client's CSV row iterator into bar frames of at most chunk_rows rows. Annotation
+    # rows are skipped and a header row starts every table, so memory stays bounded by chunk_rows.
+    header = None
+    chunk = []
+    for row in rows:
+        if not row or not any(row) or row[0].startswith("#"):
+            # a blank line or annotations start a new table, with its own header
+            if chunk:
+                yield to_bars(pd.DataFrame(chunk, columns=header), fields)
+                chunk = []
+            header = None
+            continue
+        if header is None or row == header:
+            header = row
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield to_bars(pd.DataFrame(chunk, columns=header), fields)
+            chunk = []
+    if chunk:
+        yield to_bars(pd.DataFrame(chunk, columns=header), fields)
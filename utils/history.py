@@ -0,0 +1,88 @@
+
+from typing import Dict, Optional
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+from utils.logger import setup_logger
+
+HISTORY_COLUMNS = ["time", "Open", "High", "Low", "Close", "Volume"]
+
+
+class YFinanceProvider:
+    # Historical bars from Yahoo Finance, in the column layout of DataHandler.fetch_yfinance_data
+    def fetch(self, ticker: str, period: str = "1d", interval: str = "1m") -> pd.DataFrame:
+        import yfinance as yf  # deferred: importing yfinance takes over a second
+        df = yf.Ticker(ticker).history(period=period, interval=interval)
+        df.reset_index(inplace=True)
+        df.rename(columns={"Datetime": "time", "Date": "time"}, inplace=True)
+        return df[HISTORY_COLUMNS]
+
+
+class FixtureProvider:
+    # Offline stand-in for YFinanceProvider: serves frames given in memory or <root>/<ticker>.csv
+    # files, ignoring period and interval. calls counts fetches, to check what the cache avoided.
+    def __init__(self, frames: Optional[Dict[str, pd.DataFrame]] = None, root: Optional[str] = None):
+        self.frames = frames or {}
+        self.root = root
+        self.calls = 0
+
+    def fetch(self, ticker: str, period: str = "1d", interval: str = "1m") -> pd.DataFrame:
+        self.calls += 1
+        if ticker in self.frames:
+            return self.frames[ticker][HISTORY_COLUMNS].copy()
+        path = os.path.join(self.root or "", f"{ticker}.csv")
+        if self.root is None or not os.path.exists(path):
+            raise KeyError(f"No fixture for {ticker}")
+        df = pd.read_csv(path)
+        df["time"] = pd.to_datetime(df["time"], utc=True)
+        return df[HISTORY_COLUMNS]
+
+
+class ResponseCache:
+    # On-disk cache of provider responses, one pickle per (ticker, period, interval). Entries
+    # older than ttl seconds are treated as missing, so the provider is asked again.
+    def __init__(self, root: str, ttl: float = 3600.0):
+        self.root = root
+        self.ttl = ttl
+        self.logger = setup_logger(__name__)
+
+    def path(self, ticker: str, period: str, interval: str) -> str:
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{ticker}_{period}_{interval}")
+        return os.path.join(self.root, f"{name}.pkl")
+
+    def get(self, ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        path = self.path(ticker, period, interval)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            return pd.read_pickle(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def put(self, ticker: str, period: str, interval: str, df: pd.DataFrame):
+        path = self.path(ticker, period, interval)
+        os.makedirs(self.root, exist_ok=True)
+        # write then rename, so concurrent readers never see a partial file
+        df.to_pickle(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+
+def missing_rows(times: pd.Series, stored: Optional[pd.Series]) -> np.ndarray:
+    # Boolean mask of the timestamps in times that are not in stored
+    if stored is None or len(stored) == 0:
+        return np.ones(len(times), dtype=bool)
+    ns = pd.to_datetime(times, utc=True).astype("datetime64[ns, UTC]").astype("int64").to_numpy()
+    stored_ns = pd.to_datetime(stored, utc=True).astype("datetime64[ns, UTC]").astype("int64").to_numpy()
+    return ~np.isin(ns, stored_ns)
+
+
+def gap_ranges(times: pd.Series, mask: np.ndarray) -> list:
+    # (first, last) timestamps of each contiguous run of True in mask
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    times = times.reset_index(drop=True)
+    return [(times[start], times[stop - 1]) for start, stop in zip(edges[::2], edges[1::2])]
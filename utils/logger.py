@@ -1,6 +1,7 @@
 
 import logging
 import sys
+import time
 
 def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
     logger = logging.getLogger(name)
@@ -10,4 +11,37 @@ def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         handler.setFormatter(formatter)
         logger.addHandler(handler)
-    return logger
\ No newline at end of file
+    return logger
+
+class RateLimitedLogger:
+    # For hot paths: messages take %-style arguments, so nothing is formatted unless the record is
+    # emitted, and each message (by its format string) is emitted at most once per interval
+    # seconds. The number of suppressed calls is appended to the next emitted record.
+    def __init__(self, logger: logging.Logger, interval: float = 10.0):
+        self.logger = logger
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}
+
+    def log(self, level: int, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        last = self._last.get(msg)
+        if last is not None and now - last < self.interval:
+            self._suppressed[msg] = self._suppressed.get(msg, 0) + 1
+            return
+        self._last[msg] = now
+        suppressed = self._suppressed.pop(msg, 0)
+        if suppressed:
+            msg = f"{msg} (+{suppressed} similar)"
+        self.logger.log(level, msg, *args)
+
+    def debug(self, msg: str, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args):
+        self.log(logging.INFO, msg, *args)
+
+    def warning(self, msg: str, *args):
+        self.log(logging.WARNING, msg, *args)
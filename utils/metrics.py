@@ -0,0 +1,211 @@
+
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Dict, Optional, Sequence, Tuple
+import math
+import os
+import threading
+
+# Latency buckets in seconds, from sub-millisecond signal updates to multi-second backtests
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: dict) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: Tuple[str, ...], key: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, key) if value != ""]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not self.registry.enabled:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    # A value that goes up and down, e.g. a queue depth
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self.values[key] = value
+
+
+class _Series:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, n: int):
+        self.buckets = [0] * n
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram:
+    # Cumulative-bucket histogram in the Prometheus format; observe() is one bisect under a lock
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        if self.registry.enabled:
+            self._observe(_label_key(self.labelnames, labels), value)
+
+    def _observe(self, key: Tuple[str, ...], value: float):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = _Series(len(self.bounds) + 1)
+            series.buckets[i] += 1
+            series.count += 1
+            series.sum += value
+
+    def count(self, **labels) -> int:
+        series = self.series.get(_label_key(self.labelnames, labels))
+        return series.count if series else 0
+
+    def time(self, **labels) -> "timed":
+        return timed(self, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, n in zip(self.bounds + (math.inf,), series.buckets):
+                    cumulative += n
+                    le = 'le="+Inf"' if bound == math.inf else f'le="{bound:g}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series.sum:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series.count}")
+        return lines
+
+
+class Registry:
+    # Process-wide metrics. With enabled=False every inc/observe/timed call returns immediately,
+    # so instrumented code costs one attribute check per call.
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(name, lambda: Counter(self, name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(name, lambda: Gauge(self, name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(name, lambda: Histogram(self, name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        # Prometheus text exposition format (version 0.0.4)
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics.values():
+            with metric._lock:
+                if isinstance(metric, Counter):
+                    metric.values.clear()
+                else:
+                    metric.series.clear()
+
+    def _get(self, name: str, create):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = create()
+            return self._metrics[name]
+
+
+REGISTRY = Registry(enabled=os.environ.get("METRICS_ENABLED", "1") != "0")
+
+
+class timed:
+    # Records elapsed seconds into a histogram, as a context manager or a function decorator:
+    #   with timed(QUERY_SECONDS, method="query_bars"): ...
+    #   @timed(SIGNAL_SECONDS, strategy="momentum")
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.key = _label_key(histogram.labelnames, labels)
+        self._start: Optional[float] = None
+
+    def __enter__(self) -> "timed":
+        self._start = perf_counter() if self.histogram.registry.enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self._start is not None:
+            self.histogram._observe(self.key, perf_counter() - self._start)
+
+    def __call__(self, fn):
+        histogram, key = self.histogram, self.key
+        registry = histogram.registry
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return fn(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram._observe(key, perf_counter() - start)
+        return wrapper
+
+
+# Metrics shared across modules
+INGEST_ROWS = REGISTRY.counter("ingest_rows_total", "Bars written to InfluxDB", ["path"])
+INGEST_BYTES = REGISTRY.counter("ingest_bytes_total", "Line-protocol bytes written to InfluxDB", ["path"])
+INGEST_RETRIES = REGISTRY.counter("ingest_retries_total", "Retried InfluxDB write batches")
+QUERY_SECONDS = REGISTRY.histogram("query_seconds", "InfluxDB and cache query latency", ["method"])
+SIGNAL_SECONDS = REGISTRY.histogram("signal_seconds", "Signal generation latency", ["strategy"])
+BAR_TO_SIGNAL_SECONDS = REGISTRY.histogram("bar_to_signal_seconds", "Lag from bar arrival to its signals")
+WRITER_QUEUED = REGISTRY.gauge("influx_writer_queued", "Live bars waiting in an async InfluxDB writer queue",
+                               ["writer"])
+WRITER_DROPPED = REGISTRY.counter("influx_writer_dropped_total", "Live bars an async InfluxDB writer dropped",
+                                  ["writer", "reason"])
+BACKTEST_SECONDS = REGISTRY.histogram("backtest_seconds", "Backtest run time", ["engine"])
+STARTUP_SECONDS = REGISTRY.gauge("startup_seconds", "Cold start of a main.py subcommand until it is ready",
+                                 ["command"])
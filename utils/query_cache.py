@@ -0,0 +1,161 @@
+
+from collections import OrderedDict
+from typing import Dict, Optional
+import threading
+import time
+import pandas as pd
+from utils.logger import setup_logger
+
+
+def resolve_start(start_time: str, now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    # Flux range starts are either relative durations ("-5m", "-1h", "-5d") or absolute timestamps
+    now = now if now is not None else pd.Timestamp.now(tz="UTC")
+    if start_time.startswith("-"):
+        return now + pd.Timedelta(start_time)
+    ts = pd.Timestamp(start_time)
+    return ts.tz_convert("UTC") if ts.tzinfo else ts.tz_localize("UTC")
+
+
+def _utcnow() -> pd.Timestamp:
+    return pd.Timestamp.now(tz="UTC")
+
+
+def to_flux_time(ts: pd.Timestamp) -> str:
+    return ts.tz_convert("UTC").strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class _Entry:
+    __slots__ = ("frame", "covered_from", "refreshed_at", "nbytes", "lookback")
+
+    def __init__(self, frame: pd.DataFrame, covered_from: pd.Timestamp, lookback: pd.Timedelta):
+        self.frame = frame
+        self.covered_from = covered_from
+        self.refreshed_at = time.monotonic()
+        self.nbytes = int(frame.memory_usage(index=True).sum())
+        # widest window (now - start) a caller has asked for; older rows are trimmed on refresh
+        self.lookback = lookback
+
+
+class QueryCache:
+    # Per-ticker time-series cache in front of DataHandler.query_influxdb. Each ticker keeps one
+    # sorted frame; overlapping windows are served as slices of it and only the tail after the
+    # last cached timestamp is fetched again. Rows older than the widest window a ticker has
+    # served are dropped on refresh, and least recently used tickers are evicted once the cache
+    # grows past max_bytes. InfluxDB round trips hold only their ticker's lock, so a slow query
+    # never blocks hits for other tickers.
+    def __init__(self, data_handler, max_bytes: int = 256 * 1024 * 1024, ttl: float = 5.0):
+        self.data_handler = data_handler
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.logger = setup_logger(__name__)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._ticker_locks: Dict[str, threading.Lock] = {}
+        # bumped by invalidate(), so a fetch that raced with it does not install its result
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.tail_fetches = 0
+        self.evictions = 0
+        self.rows_fetched = 0
+
+    def get(self, ticker: str, start_time: str = "-1d") -> Optional[pd.DataFrame]:
+        now = _utcnow()
+        start = resolve_start(start_time, now)
+        with self._ticker_lock(ticker):
+            with self._lock:
+                entry = self._entries.get(ticker)
+                generation = self._generation
+                if entry is None or start < entry.covered_from:
+                    self.misses += 1
+                    entry = None
+                elif time.monotonic() - entry.refreshed_at >= self.ttl:
+                    self.tail_fetches += 1
+                    stale = True
+                else:
+                    self.hits += 1
+                    stale = False
+            if entry is None:
+                entry = self._fetch(ticker, start, now, generation)
+                if entry is None:
+                    return None
+            elif stale:
+                self._refresh_tail(ticker, entry, now, generation)
+            with self._lock:
+                entry.lookback = max(entry.lookback, now - start)
+                if ticker in self._entries:
+                    self._entries.move_to_end(ticker)
+                frame = entry.frame
+        first = frame["time"].searchsorted(start)
+        if first >= len(frame):
+            return None
+        return frame.iloc[first:]
+
+    def invalidate(self, ticker: Optional[str] = None):
+        with self._lock:
+            self._generation += 1
+            if ticker is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(ticker, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tail_fetches": self.tail_fetches,
+                "round_trips": self.misses + self.tail_fetches,
+                "evictions": self.evictions,
+                "rows_fetched": self.rows_fetched,
+                "tickers": len(self._entries),
+                "bytes": sum(e.nbytes for e in self._entries.values()),
+            }
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _fetch(self, ticker: str, start: pd.Timestamp, now: pd.Timestamp, generation: int) -> Optional[_Entry]:
+        df = self.data_handler.query_influxdb(ticker, start_time=to_flux_time(start))
+        if df is None:
+            return None
+        entry = _Entry(df.sort_values("time", ignore_index=True), start, now - start)
+        with self._lock:
+            self.rows_fetched += len(df)
+            if generation == self._generation:
+                self._entries[ticker] = entry
+                self._entries.move_to_end(ticker)
+                self._evict()
+        return entry
+
+    def _refresh_tail(self, ticker: str, entry: _Entry, now: pd.Timestamp, generation: int):
+        frame = entry.frame
+        since = frame["time"].iloc[-1] if not frame.empty else entry.covered_from
+        tail = self.data_handler.query_influxdb(ticker, start_time=to_flux_time(since))
+        entry.refreshed_at = time.monotonic()
+        if tail is None or tail.empty:
+            return
+        # range() is inclusive, so the last cached bar comes back and may have been updated;
+        # rows before the widest window served so far are dropped in the same copy
+        cutoff = max(entry.covered_from, now - entry.lookback)
+        kept = frame.iloc[frame["time"].searchsorted(cutoff):frame["time"].searchsorted(since)]
+        merged = pd.concat([kept, tail[tail["time"] >= cutoff]], ignore_index=True)
+        merged = merged.drop_duplicates(subset="time", keep="last").sort_values("time", ignore_index=True)
+        with self._lock:
+            self.rows_fetched += len(tail)
+            entry.frame = merged
+            entry.covered_from = cutoff
+            entry.nbytes = int(merged.memory_usage(index=True).sum())
+            if generation == self._generation and ticker in self._entries:
+                self._entries.move_to_end(ticker)
+                self._evict()
+
+    def _evict(self):
+        # The most recently used entry is always kept; refresh trimming bounds its size
+        total = sum(e.nbytes for e in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            ticker, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            self.evictions += 1
+            self.logger.debug(f"Evicted {ticker} from query cache ({entry.nbytes} bytes)")
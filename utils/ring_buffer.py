@@ -0,0 +1,121 @@
+
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def _time_ns(time) -> int:
+    # pd.Timestamp / datetime / datetime64 / epoch nanoseconds
+    if isinstance(time, (int, np.integer)):
+        return int(time)
+    if not isinstance(time, pd.Timestamp):
+        time = pd.Timestamp(time)
+    return time.value
+
+
+class BarRingBuffer:
+    # Fixed-capacity OHLCV history for one symbol, preallocated once. Every bar is written twice,
+    # at slot i and i + capacity, so the newest n bars are always one contiguous slice and
+    # window()/column() return views instead of copies. A bar with the same timestamp as the
+    # newest one replaces it; older timestamps are rejected, keeping the time column sorted.
+    # Views show the live buffer: copy them if they must outlive the next `capacity` appends.
+    def __init__(self, capacity: int = 100):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._time = np.zeros(2 * capacity, dtype=np.int64)
+        self._data = np.zeros((len(FIELDS), 2 * capacity), dtype=np.float64)
+        self._last = -1
+        self._size = 0
+        self.replaced = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return int(self._time[self._last]) if self._size else None
+
+    def append(self, time, open: float, high: float, low: float, close: float, volume: float) -> bool:
+        # O(1); returns False when the bar is older than the newest one held
+        time = _time_ns(time)
+        if self._size:
+            last = self._time[self._last]
+            if time < last:
+                self.rejected += 1
+                return False
+            if time == last:
+                self.replaced += 1
+                self._write(self._last, time, open, high, low, close, volume)
+                return True
+        self._last = (self._last + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self._write(self._last, time, open, high, low, close, volume)
+        return True
+
+    def append_bar(self, bar) -> bool:
+        return self.append(bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+    def times(self, n: Optional[int] = None) -> np.ndarray:
+        return self._view(self._time, n)
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        return self._view(self._data[FIELDS.index(name)], n)
+
+    def window(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        # The newest n bars (all held bars by default), oldest first, as read-only views
+        result = {"time": self.times(n)}
+        result.update({name: self._view(self._data[i], n) for i, name in enumerate(FIELDS)})
+        return result
+
+    def index_of(self, time) -> Optional[int]:
+        # Position of a timestamp within window(), or None when it is not held
+        times = self.times()
+        i = int(np.searchsorted(times, _time_ns(time)))
+        return i if i < len(times) and times[i] == _time_ns(time) else None
+
+    def to_frame(self, n: Optional[int] = None) -> pd.DataFrame:
+        # Copy in the query_influxdb column layout, for code that still expects DataFrames
+        window = self.window(n)
+        data = {"time": pd.to_datetime(window.pop("time"), utc=True)}
+        data.update({name: values.copy() for name, values in window.items()})
+        return pd.DataFrame(data)
+
+    def _write(self, slot: int, time: int, *values: float):
+        self._time[slot] = self._time[slot + self.capacity] = time
+        self._data[:, slot] = self._data[:, slot + self.capacity] = values
+
+    def _view(self, array: np.ndarray, n: Optional[int]) -> np.ndarray:
+        n = self._size if n is None else min(n, self._size)
+        end = self._last + self.capacity + 1
+        view = array[end - n:end]
+        view.flags.writeable = False
+        return view
+
+
+class BarBuffers:
+    # Ring buffers for many symbols, created on first use; memory per symbol is fixed by capacity
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._buffers: Dict[str, BarRingBuffer] = {}
+
+    def __getitem__(self, ticker: str) -> BarRingBuffer:
+        buffer = self._buffers.get(ticker)
+        if buffer is None:
+            buffer = self._buffers[ticker] = BarRingBuffer(self.capacity)
+        return buffer
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._buffers and len(self._buffers[ticker]) > 0
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def append(self, bar) -> bool:
+        return self[bar.ticker].append_bar(bar)
+
+    def nbytes(self) -> int:
+        return sum(b._time.nbytes + b._data.nbytes for b in self._buffers.values())